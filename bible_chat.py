@@ -7,9 +7,13 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt
+from rich.live import Live
 from langchain_openai import ChatOpenAI
-from prompts import BIBLE_MOTIVATE_PROMPT
-from utils import VerseManager, extract_keywords_from_input
+from utils import get_verse_manager
+from llm_client import create_llm
+from pipeline import ResponsePipeline, get_background_loop
+from offline_mode import get_offline_response
+from config import config
 from dotenv import load_dotenv
 
 # Configure logging
@@ -21,9 +25,10 @@ class BibleChatBot:
     
     def __init__(self):
         self.console = Console()
-        self.verse_manager = VerseManager()
+        self.verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
         self.llm: Optional[ChatOpenAI] = None
         self._setup_llm()
+        self.pipeline = ResponsePipeline(self.llm, self.verse_manager)
     
     def _setup_llm(self):
         """Initialize the LLM with error handling."""
@@ -41,37 +46,48 @@ class BibleChatBot:
             sys.exit(1)
         
         try:
-            self.llm = ChatOpenAI(
-                temperature=0.6,
-                model="gpt-3.5-turbo",
-                api_key=api_key
-            )
+            self.llm = create_llm(api_key)
             logger.info("LLM initialized successfully")
         except Exception as e:
             self.console.print(f"[red]Error initializing OpenAI: {e}[/red]")
             sys.exit(1)
     
-    def _get_response(self, user_input: str) -> str:
-        """Generate response with improved verse selection."""
+    def _offline_response(self, user_input: str) -> str:
+        """Template-based reply used when the AI response fails."""
+        return get_offline_response(user_input)
+    
+    def _response_panel(self, body) -> Panel:
+        return Panel(
+            body,
+            title="[bold blue]Encouragement[/bold blue]",
+            border_style="blue",
+            padding=(1, 2)
+        )
+    
+    async def _render_response(self, user_input: str, live: Live):
+        """Stream the response from the pipeline into the live panel."""
+        text = Text()
         try:
-            # Extract keywords for better verse matching
-            keywords = extract_keywords_from_input(user_input)
-            verse = self.verse_manager.pick_verse(keywords=keywords)
-            
-            # Use modern LangChain pattern
-            chain = BIBLE_MOTIVATE_PROMPT | self.llm
-            response = chain.invoke({
-                'user_input': user_input,
-                'verse_ref': verse['ref'],
-                'verse_text': verse['text']
-            })
-            return response.content.strip()
-            
+            async for chunk in self.pipeline.stream(user_input):
+                text.append(chunk)
+                live.update(self._response_panel(text))
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return ("I'm here with you in this moment. Sometimes we face challenges that feel overwhelming, "
-                   "but remember: 'The LORD is my shepherd; I shall not want.' (Psalm 23:1) "
-                   "Take a deep breath and know that you're not alone in this journey.")
+            # Replace a failed or partial answer with the offline reply
+            logger.error(f"Error streaming response: {e}")
+            text = Text()
+        if not text.plain:
+            live.update(self._response_panel(self._offline_response(user_input)))
+    
+    def _display_streamed_response(self, user_input: str):
+        """Render the response progressively in a live panel as tokens arrive."""
+        with Live(self._response_panel(Text("Reflecting on your words...", style="dim")),
+                  console=self.console, refresh_per_second=12) as live:
+            future = get_background_loop().submit(self._render_response(user_input, live))
+            try:
+                future.result()
+            except KeyboardInterrupt:
+                future.cancel()
+                raise
     
     def _display_welcome(self):
         """Display welcome message with styling."""
@@ -120,19 +136,8 @@ class BibleChatBot:
                     self._display_help()
                     continue
                 
-                # Show thinking indicator
-                with self.console.status("[dim]Reflecting on your words...[/dim]"):
-                    response = self._get_response(user_input)
-                
-                # Display response in a styled panel
-                self.console.print(
-                    Panel(
-                        response,
-                        title="[bold blue]Encouragement[/bold blue]",
-                        border_style="blue",
-                        padding=(1, 2)
-                    )
-                )
+                # Stream the response into a styled panel
+                self._display_streamed_response(user_input)
                 
             except KeyboardInterrupt:
                 self.console.print("\n[yellow]Goodbye! May God's peace be with you.[/yellow]")
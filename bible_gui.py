@@ -10,10 +10,15 @@ from tkinter import messagebox, scrolledtext
 from typing import Optional
 import customtkinter as ctk
 from langchain_openai import ChatOpenAI
-from prompts import BIBLE_MOTIVATE_PROMPT, get_prompt_for_context
-from utils import VerseManager, extract_keywords_from_input
+from utils import get_verse_manager, extract_keywords_from_input
+from llm_client import create_llm
+from pipeline import ResponsePipeline, get_background_loop
+from config import config
 from dotenv import load_dotenv
 
+# Streamed tokens are inserted in batches at most this often (milliseconds)
+STREAM_FLUSH_MS = 30
+
 # Configure CustomTkinter
 ctk.set_appearance_mode("dark")  # "dark" or "light"
 ctk.set_default_color_theme("blue")  # "blue", "green", "dark-blue"
@@ -23,10 +28,19 @@ class BibleMotivatorGUI:
     
     def __init__(self):
         self.root = ctk.CTk()
-        self.verse_manager = VerseManager()
+        self.verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
+        if config.get('verses_watch'):
+            # Long-running app: pick up edits to the verses file without a restart
+            self.verse_manager.watch(config.get('verses_watch_interval'))
         self.llm: Optional[ChatOpenAI] = None
         self.current_mode = "general"  # "general" or "programmer"
         
+        # Streamed tokens waiting for the main loop
+        self._stream_buffer = []
+        self._stream_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._response_start = "end-1c"
+        
         self.setup_window()
         self.setup_llm()
         self.create_widgets()
@@ -53,11 +67,7 @@ class BibleMotivatorGUI:
             return
             
         try:
-            self.llm = ChatOpenAI(
-                temperature=0.6,
-                model="gpt-3.5-turbo",
-                api_key=api_key
-            )
+            self.llm = create_llm(api_key)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to initialize OpenAI: {str(e)}")
             
@@ -128,11 +138,7 @@ class BibleMotivatorGUI:
                 f.write(f"OPENAI_API_KEY={api_key}\n")
             
             # Initialize LLM
-            self.llm = ChatOpenAI(
-                temperature=0.6,
-                model="gpt-3.5-turbo",
-                api_key=api_key
-            )
+            self.llm = create_llm(api_key)
             
             dialog.destroy()
             messagebox.showinfo("Success", "API key saved successfully!")
@@ -306,40 +312,62 @@ You are not alone in your journey. ✨
         self.status_label.configure(text="Reflecting on your words...")
         self.send_button.configure(state="disabled", text="...")
         
-        # Get response in background thread
-        threading.Thread(target=self.get_response_async, args=(message,), daemon=True).start()
+        # Streamed text is inserted after this point as it arrives
+        self.chat_display.insert("end", "Bot: ")
+        self._response_start = self.chat_display.index("end-1c")
         
-    def get_response_async(self, message):
-        """Get AI response in background thread."""
+        # Get response on the shared background event loop
+        get_background_loop().submit(self.get_response_async(message))
+        
+    async def get_response_async(self, message):
+        """Stream the AI response from the async pipeline (runs on the background loop)."""
         try:
-            # Extract keywords for better verse matching
-            keywords = extract_keywords_from_input(message)
-            verse = self.verse_manager.pick_verse(keywords=keywords)
-            
-            # Get appropriate prompt
-            if self.current_mode == "programmer":
-                prompt = get_prompt_for_context("programmer")
-            else:
-                prompt = BIBLE_MOTIVATE_PROMPT
-                
-            # Generate response
-            chain = prompt | self.llm
-            response = chain.invoke({
-                'user_input': message,
-                'verse_ref': verse['ref'],
-                'verse_text': verse['text']
-            })
+            # Keyword extraction, verse pick and the cached model call for the current mode
+            pipeline = ResponsePipeline(self.llm, self.verse_manager)
+            streamed = False
+            async for chunk in pipeline.stream(message, context=self.current_mode, ranked=False):
+                self.queue_stream_text(chunk)
+                streamed = True
             
             # Update UI in main thread
-            self.root.after(0, self.display_response, response.content.strip())
+            self.root.after(0, self.finish_response, None if streamed else self.get_fallback_response(message))
             
         except Exception as e:
             fallback_response = self.get_fallback_response(message)
-            self.root.after(0, self.display_response, fallback_response)
+            self.root.after(0, self.finish_response, fallback_response)
+            
+    def queue_stream_text(self, text):
+        """
+        Buffer streamed text from the background loop for the Tk main loop.
+        
+        At most one flush is scheduled at a time, STREAM_FLUSH_MS after the
+        first buffered chunk, so tokens reach the chat in coalesced batches
+        instead of one after() call per token.
+        """
+        with self._stream_lock:
+            self._stream_buffer.append(text)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.root.after(STREAM_FLUSH_MS, self.flush_stream_text)
+        
+    def flush_stream_text(self):
+        """Insert all buffered streamed text in one go (main thread)."""
+        with self._stream_lock:
+            text = ''.join(self._stream_buffer)
+            self._stream_buffer.clear()
+            self._flush_scheduled = False
+        if text:
+            self.chat_display.insert("end", text)
+            self.chat_display.see("end")
             
-    def display_response(self, response):
-        """Display the AI response in the chat."""
-        self.chat_display.insert("end", f"Bot: {response}\n\n")
+    def finish_response(self, fallback_response):
+        """Complete the streamed response, replacing it with the fallback if the stream failed."""
+        self.flush_stream_text()
+        if fallback_response is not None:
+            self.chat_display.delete(self._response_start, "end")
+            self.chat_display.insert("end", fallback_response)
+        self.chat_display.insert("end", "\n\n")
         self.chat_display.insert("end", "-" * 30 + "\n\n")
         self.chat_display.see("end")
         
@@ -350,7 +378,7 @@ You are not alone in your journey. ✨
     def get_fallback_response(self, message):
         """Get fallback response when AI is unavailable."""
         keywords = extract_keywords_from_input(message)
-        verse = self.verse_manager.pick_verse(keywords=keywords)
+        verse = self.verse_manager.pick_verse(keywords=keywords, query=message)
         
         return (f"I hear you, and I want you to know that you're not alone. "
                 f"Here's an encouraging verse for you:\n\n"
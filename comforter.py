@@ -5,11 +5,19 @@ using LangChain for intelligent responses and Streamlit for the user interface.
 """
 import streamlit as st
 import os
-from typing import Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, AIMessage
-from prompts import BIBLE_MOTIVATE_PROMPT, get_prompt_for_context, DATING_ADVICE_PROMPT, SPIRITUAL_GUIDANCE_PROMPT
-from utils import VerseManager, extract_keywords_from_input
+import time
+import uuid
+from typing import Iterator
+from utils import get_verse_manager, extract_keywords_from_input
+from pipeline import ResponsePipeline
+from response_cache import cached_stream
+from llm_client import create_llm
+from rate_limiter import RateLimitExceeded
+from offline_mode import get_offline_response
+from config import config
+
+# Minimum seconds between streamed placeholder updates
+STREAM_UPDATE_INTERVAL = 0.05
 
 # Page configuration
 st.set_page_config(
@@ -226,13 +234,21 @@ class ComforterApp:
     """Beautiful LangChain-powered Bible Comforter with Streamlit GUI."""
     
     def __init__(self):
-        self.verse_manager = VerseManager()
+        self.verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
+        if config.get('verses_watch'):
+            # Long-running app: pick up edits to the verses file without a restart
+            self.verse_manager.watch(config.get('verses_watch_interval'))
         self.initialize_session_state()
+        # Shared verse/prompt selection; the model is set once an API key is configured
+        self.pipeline = ResponsePipeline(st.session_state.llm, self.verse_manager)
     
     def initialize_session_state(self):
         """Initialize Streamlit session state variables."""
         if 'messages' not in st.session_state:
             st.session_state.messages = []
+        if 'session_id' not in st.session_state:
+            # Identifies this browser session for fair rate-limit queueing
+            st.session_state.session_id = uuid.uuid4().hex
         if 'api_key_configured' not in st.session_state:
             st.session_state.api_key_configured = False
         if 'current_mode' not in st.session_state:
@@ -262,26 +278,11 @@ class ComforterApp:
             st.session_state.api_key_configured = True
             try:
                 if not st.session_state.llm:
-                    # Initialize LangChain ChatOpenAI for OpenRouter
-                    if "sk-or-v1" in api_key:
-                        # OpenRouter configuration
-                        st.session_state.llm = ChatOpenAI(
-                            temperature=0.7,
-                            model="openai/gpt-3.5-turbo",
-                            api_key=api_key,
-                            base_url="https://openrouter.ai/api/v1",
-                            max_tokens=300
-                        )
-                    else:
-                        # Standard OpenAI configuration
-                        st.session_state.llm = ChatOpenAI(
-                            temperature=0.7,
-                            model="gpt-3.5-turbo",
-                            api_key=api_key,
-                            max_tokens=300
-                        )
+                    # Shared, config-driven model (OpenRouter keys are routed automatically)
+                    st.session_state.llm = create_llm(api_key)
+                self.pipeline.llm = st.session_state.llm
                 st.sidebar.success("✅ LangChain AI Ready!")
-                st.sidebar.info("🤖 Using GPT-3.5-turbo for intelligent Bible-based responses")
+                st.sidebar.info(f"🤖 Using {st.session_state.llm.model_name} for intelligent Bible-based responses")
             except Exception as e:
                 st.sidebar.error(f"❌ LangChain setup error: {str(e)}")
                 st.session_state.api_key_configured = False
@@ -342,13 +343,11 @@ class ComforterApp:
             st.session_state.messages = []
             st.rerun()
         
-        # Statistics
+        # Statistics (kept in a placeholder so a new message can refresh them without a rerun)
         st.sidebar.markdown("### 📊 Session Stats")
-        st.sidebar.info(f"""
-        **Messages:** {len(st.session_state.messages)}
-        **Mode:** {mode}
-        **Verses Available:** {len(self.verse_manager._verses)}
-        """)
+        self._stats_placeholder = st.sidebar.empty()
+        self._stats_mode = mode
+        self.render_session_stats()
         
         # Help section
         with st.sidebar.expander("❓ How to Use"):
@@ -371,6 +370,14 @@ class ComforterApp:
             - Developer-specific encouragement
             """)
     
+    def render_session_stats(self):
+        """Fill the sidebar statistics placeholder."""
+        self._stats_placeholder.info(f"""
+        **Messages:** {len(st.session_state.messages)}
+        **Mode:** {self._stats_mode}
+        **Verses Available:** {len(self.verse_manager._verses)}
+        """)
+    
     def show_random_verse(self):
         """Display a random Bible verse."""
         verse = self.verse_manager.pick_verse()
@@ -381,43 +388,53 @@ class ComforterApp:
         })
         st.rerun()
     
-    def get_ai_response(self, user_input: str) -> str:
-        """Generate AI response with verse using LangChain."""
+    def stream_ai_response(self, user_input: str) -> Iterator[str]:
+        """Stream the AI response text as it is generated; errors propagate to the caller."""
+        mode = st.session_state.current_mode
+        prompt, inputs = self.pipeline.prepare(user_input, mode)
+        return cached_stream(prompt, self.pipeline.llm, inputs, cache=self.pipeline.cache,
+                             semantic=self.pipeline.semantic, session=st.session_state.session_id, mode=mode)
+    
+    def generate_response(self, user_input: str, placeholder) -> str:
+        """
+        Write the response for a message into a placeholder progressively.
+        
+        Placeholder updates are throttled to STREAM_UPDATE_INTERVAL so long
+        answers do not send one page delta per token.
+        
+        Returns:
+            Final response text
+        """
+        if not (st.session_state.api_key_configured and st.session_state.llm):
+            response = self.get_fallback_response(user_input)
+            placeholder.markdown(self._bot_message_html(response), unsafe_allow_html=True)
+            return response
+        
+        placeholder.markdown(self._bot_message_html("🕊️ Bringing you comfort..."), unsafe_allow_html=True)
+        response = ""
+        last_update = 0.0
         try:
-            # Extract keywords for better verse matching
-            keywords = extract_keywords_from_input(user_input)
-            
-            # Add mode-specific keywords for better verse selection
-            if st.session_state.current_mode == "dating":
-                keywords.extend(['love', 'wisdom', 'patience', 'guidance'])
-            elif st.session_state.current_mode == "spiritual":
-                keywords.extend(['faith', 'hope', 'trust', 'guidance'])
-            elif st.session_state.current_mode == "programmer":
-                keywords.extend(['strength', 'patience', 'wisdom'])
-            
-            verse = self.verse_manager.pick_verse(keywords=keywords)
-            
-            # Get appropriate prompt based on mode
-            prompt = get_prompt_for_context(st.session_state.current_mode)
-            
-            # Generate response using LangChain
-            chain = prompt | st.session_state.llm
-            response = chain.invoke({
-                'user_input': user_input,
-                'verse_ref': verse['ref'],
-                'verse_text': verse['text']
-            })
-            
-            return response.content.strip()
-            
-        except Exception as e:
-            # Fallback response
-            return self.get_fallback_response(user_input)
+            for chunk in self.stream_ai_response(user_input):
+                response += chunk
+                now = time.monotonic()
+                if now - last_update >= STREAM_UPDATE_INTERVAL:
+                    placeholder.markdown(self._bot_message_html(response + " ▌"), unsafe_allow_html=True)
+                    last_update = now
+        except RateLimitExceeded:
+            # Shed by the rate limiter before anything streamed: answer from the offline responder
+            response = get_offline_response(user_input, st.session_state.current_mode)
+        except Exception:
+            # Replace a failed or partial answer with the fallback
+            response = ""
+        if not response.strip():
+            response = self.get_fallback_response(user_input)
+        placeholder.markdown(self._bot_message_html(response), unsafe_allow_html=True)
+        return response
     
     def get_fallback_response(self, user_input: str) -> str:
         """Get fallback response when AI is unavailable."""
         keywords = extract_keywords_from_input(user_input)
-        verse = self.verse_manager.pick_verse(keywords=keywords)
+        verse = self.verse_manager.pick_verse(keywords=keywords, query=user_input)
         
         # Mode-specific encouraging responses
         if st.session_state.current_mode == "dating":
@@ -443,6 +460,29 @@ class ComforterApp:
         
         return f"{response}\n\n*\"{verse['text']}\"*\n\n**{verse['ref']}**\n\nTake heart and remember that God is with you in every challenge."
     
+    def _user_message_html(self, content: str) -> str:
+        return f"""
+                <div class="user-message">
+                    <strong>You:</strong> {content}
+                </div>
+                """
+    
+    def _bot_message_html(self, content: str) -> str:
+        # Apply mode-specific styling for bot messages
+        mode_class = ""
+        if st.session_state.current_mode == "dating":
+            mode_class = " dating-message"
+        elif st.session_state.current_mode == "spiritual":
+            mode_class = " spiritual-message"
+        elif st.session_state.current_mode == "programmer":
+            mode_class = " programmer-message"
+        
+        return f"""
+                <div class="bot-message{mode_class}">
+                    <strong>🕊️ Comfort:</strong><br>{content}
+                </div>
+                """
+    
     def render_chat_interface(self):
         """Render the main chat interface."""
         # Header
@@ -456,26 +496,9 @@ class ComforterApp:
         # Display chat messages
         for message in st.session_state.messages:
             if message["role"] == "user":
-                st.markdown(f"""
-                <div class="user-message">
-                    <strong>You:</strong> {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(self._user_message_html(message["content"]), unsafe_allow_html=True)
             else:
-                # Apply mode-specific styling for bot messages
-                mode_class = ""
-                if st.session_state.current_mode == "dating":
-                    mode_class = " dating-message"
-                elif st.session_state.current_mode == "spiritual":
-                    mode_class = " spiritual-message"
-                elif st.session_state.current_mode == "programmer":
-                    mode_class = " programmer-message"
-                
-                st.markdown(f"""
-                <div class="bot-message{mode_class}">
-                    <strong>🕊️ Comfort:</strong><br>{message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(self._bot_message_html(message["content"]), unsafe_allow_html=True)
         
         # Chat input
         if st.session_state.current_mode == "programmer":
@@ -486,18 +509,16 @@ class ComforterApp:
         user_input = st.chat_input(placeholder)
         
         if user_input:
-            # Add user message
+            # Add user message and render it right away
             st.session_state.messages.append({
                 "role": "user", 
                 "content": user_input
             })
+            st.markdown(self._user_message_html(user_input), unsafe_allow_html=True)
             
-            # Generate response
-            with st.spinner("🕊️ Bringing you comfort..."):
-                if st.session_state.api_key_configured and st.session_state.llm:
-                    response = self.get_ai_response(user_input)
-                else:
-                    response = self.get_fallback_response(user_input)
+            # Stream the response in place; the page already shows the full
+            # exchange afterwards, so no extra st.rerun() is needed
+            response = self.generate_response(user_input, st.empty())
             
             # Add assistant response
             st.session_state.messages.append({
@@ -506,7 +527,7 @@ class ComforterApp:
             })
             
             st.session_state.total_encouragements += 1
-            st.rerun()
+            self.render_session_stats()
         
         # Welcome message for new users
         if not st.session_state.messages:
@@ -19,11 +19,40 @@ class Config:
             'openai_model': os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
             'openai_temperature': float(os.getenv('OPENAI_TEMPERATURE', '0.6')),
             'openai_max_tokens': int(os.getenv('OPENAI_MAX_TOKENS', '300')),
+            'openai_base_url': os.getenv('OPENAI_BASE_URL'),
+            'openai_timeout': float(os.getenv('OPENAI_TIMEOUT', '30')),
+            'openai_connect_timeout': float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5')),
+            'openai_max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '2')),
+            'openai_pool_size': int(os.getenv('OPENAI_POOL_SIZE', '20')),
+            'openai_keepalive_expiry': float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30')),
+            
+            # Client-side rate limiting
+            'rate_limit': os.getenv('RATE_LIMIT', 'true').lower() == 'true',
+            'openai_rpm': float(os.getenv('OPENAI_RPM', '500')),
+            'openai_tpm': float(os.getenv('OPENAI_TPM', '90000')),
+            'rate_limit_deadline': float(os.getenv('RATE_LIMIT_DEADLINE', '10')),
             
             # Application Settings
             'verses_file': os.getenv('VERSES_FILE', 'bible_verses.json'),
+            'lexicon_file': os.getenv('LEXICON_FILE', 'lexicon.json'),
+            'verses_watch': os.getenv('VERSES_WATCH', 'true').lower() == 'true',
+            'verses_watch_interval': float(os.getenv('VERSES_WATCH_INTERVAL', '2.0')),
+            'retrieval_backend': os.getenv('RETRIEVAL_BACKEND', 'keyword'),
             'log_level': os.getenv('LOG_LEVEL', 'INFO'),
             'response_max_words': int(os.getenv('RESPONSE_MAX_WORDS', '200')),
+            'batch_concurrency': int(os.getenv('BATCH_CONCURRENCY', '8')),
+            
+            # Response Cache
+            'response_cache': os.getenv('RESPONSE_CACHE', 'true').lower() == 'true',
+            'response_cache_size': int(os.getenv('RESPONSE_CACHE_SIZE', '256')),
+            'response_cache_ttl': float(os.getenv('RESPONSE_CACHE_TTL', '86400')),
+            'response_cache_db': os.getenv('RESPONSE_CACHE_DB', 'response_cache.sqlite3'),
+            'response_cache_db_max_entries': int(os.getenv('RESPONSE_CACHE_DB_MAX_ENTRIES', '10000')),
+            'response_cache_max_entry_bytes': int(os.getenv('RESPONSE_CACHE_MAX_ENTRY_BYTES', '16384')),
+            'semantic_cache': os.getenv('SEMANTIC_CACHE', 'true').lower() == 'true',
+            'semantic_cache_threshold': float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9')),
+            'semantic_cache_size': int(os.getenv('SEMANTIC_CACHE_SIZE', '1024')),
+            'request_coalescing': os.getenv('REQUEST_COALESCING', 'true').lower() == 'true',
             
             # UI Settings
             'use_rich_ui': os.getenv('USE_RICH_UI', 'true').lower() == 'true',
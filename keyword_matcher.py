@@ -0,0 +1,136 @@
+"""Precompiled multi-keyword matcher (Aho-Corasick) for user input."""
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Iterator
+from stemmer import analyze
+
+class Automaton:
+    """
+    Aho-Corasick automaton over a fixed list of patterns.
+
+    A trie over the patterns plus failure links, so scanning a text costs
+    O(len(text) + hits) no matter how many patterns there are.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        # Trie nodes: outgoing edges, failure link and ids of patterns ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            self._add(pattern, pattern_id)
+        self._link()
+
+    def _add(self, pattern: str, pattern_id: int):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append(pattern_id)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start offset, pattern id) for every pattern occurrence in text."""
+        goto, fail, outputs, patterns = self._goto, self._fail, self._outputs, self.patterns
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern_id in outputs[node]:
+                yield position - len(patterns[pattern_id]) + 1, pattern_id
+
+class KeywordMatcher:
+    """
+    Finds every keyword (word or phrase) of a keyword map in one pass over a text.
+
+    Matching modes for lookup():
+
+    - default: keys and input both go through stemmer.analyze (tokenize +
+      stem), and a key matches a whole run of input tokens. Punctuation and
+      inflections therefore still hit ("Tired." / "tiring" -> "tired",
+      "bugs" -> "bug") while words merely containing a key do not ("using"
+      does not match "sin").
+    - legacy_partial: the original per-word rule on raw split() words, where a
+      word matches the first key (in map order) with ``key in word or word in key``
+    """
+
+    def __init__(self, keyword_map: Dict[str, List[str]]):
+        self.keyword_map = keyword_map
+        self.keys = list(keyword_map)
+        # Keys with the same analyzed form ("failed", "fails") share one pattern
+        phrase_values: Dict[str, List[str]] = {}
+        for key, values in keyword_map.items():
+            phrase = ' '.join(analyze(key))
+            if phrase:
+                phrase_values.setdefault(phrase, []).extend(values)
+        self._phrase_values = list(phrase_values.values())
+        self._automaton = Automaton(list(phrase_values))
+        # Only needed by the legacy mode, so built on first use
+        self._raw_automaton: Optional[Automaton] = None
+        self._containing_key: Optional[Dict[str, int]] = None
+
+    def _first_key_in_word(self, word: str) -> Optional[int]:
+        """Legacy rule: the first key (in map order) with key in word or word in key."""
+        if self._raw_automaton is None:
+            # Every substring of every key -> first key containing it ("word in key")
+            containing_key: Dict[str, int] = {}
+            for key_id, key in enumerate(self.keys):
+                for start in range(len(key)):
+                    for end in range(start + 1, len(key) + 1):
+                        containing_key.setdefault(key[start:end], key_id)
+            self._containing_key = containing_key
+            self._raw_automaton = Automaton(self.keys)
+        candidates = [key_id for _, key_id in self._raw_automaton.finditer(word)]
+        containing = self._containing_key.get(word)
+        if containing is not None:
+            candidates.append(containing)
+        return min(candidates) if candidates else None
+
+    def lookup(self, text: str, legacy_partial: bool = False) -> List[str]:
+        """
+        Map text to the values of every matching key.
+
+        Args:
+            text: Input text (matched case-insensitively)
+            legacy_partial: Use the original per-word partial-match rule
+
+        Returns:
+            Matched values, without duplicates, in first-match order
+        """
+        values: List[str] = []
+        if legacy_partial:
+            for word in text.lower().split():
+                if word in self.keyword_map:
+                    values.extend(self.keyword_map[word])
+                key_id = self._first_key_in_word(word)
+                if key_id is not None:
+                    values.extend(self.keyword_map[self.keys[key_id]])
+        else:
+            normalized = ' '.join(analyze(text))
+            patterns = self._automaton.patterns
+            for start, phrase_id in self._automaton.finditer(normalized):
+                end = start + len(patterns[phrase_id])
+                # Only whole tokens count
+                if (start == 0 or normalized[start - 1] == ' ') and (end == len(normalized) or normalized[end] == ' '):
+                    values.extend(self._phrase_values[phrase_id])
+        return list(dict.fromkeys(values))
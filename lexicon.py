@@ -0,0 +1,166 @@
+"""
+Shared keyword lexicon (user words -> verse tags) for every front end.
+
+The lexicon lives in lexicon.json:
+
+- "keywords": named sections of word/phrase -> tags maps ("general" is used
+  for every message; other sections add context-specific words, e.g.
+  "programmer")
+- "modes": tags always added for a conversation mode (e.g. "dating")
+
+Each section is compiled into a KeywordMatcher automaton. The compiled
+lexicon is pickled next to the JSON file and reused while neither the JSON
+nor the code that compiles it has changed, and loading is lazy, so growing the lexicon costs nothing at
+import time and stays a single pass per message.
+"""
+import json
+import pickle
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import stemmer
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEXICON = Path(__file__).parent / 'lexicon.json'
+CACHE_SUFFIX = '.pkl'
+# Modules whose code determines what gets compiled
+_COMPILER_MODULES = (stemmer, keyword_matcher)
+_code_version: Optional[str] = None
+
+class Lexicon:
+    """Compiled keyword sections and mode tags."""
+
+    def __init__(self, keywords: Dict[str, Dict[str, List[str]]], modes: Dict[str, List[str]]):
+        self.matchers = {
+            section: KeywordMatcher({word.lower(): tags for word, tags in words.items()})
+            for section, words in keywords.items()
+        }
+        self.modes = {mode.lower(): list(tags) for mode, tags in modes.items()}
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'Lexicon':
+        """Compile a lexicon JSON file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('keywords', {}), data.get('modes', {}))
+
+    def match(self, text: str, sections: Tuple[str, ...] = ('general',),
+              legacy_partial: bool = False) -> List[str]:
+        """
+        Get the tags of every lexicon entry found in text.
+
+        Args:
+            text: User message
+            sections: Keyword sections to match (unknown sections are skipped)
+            legacy_partial: Use the original per-word partial matching
+
+        Returns:
+            Tags without duplicates, in section then first-match order
+        """
+        tags: List[str] = []
+        for section in sections:
+            matcher = self.matchers.get(section)
+            if matcher is not None:
+                tags.extend(matcher.lookup(text, legacy_partial=legacy_partial))
+        return list(dict.fromkeys(tags))
+
+    def mode_tags(self, mode: Optional[str]) -> List[str]:
+        """Get the tags always added for a conversation mode."""
+        return list(self.modes.get(mode.lower(), [])) if mode else []
+
+def _cache_path(path: Path) -> Path:
+    return path.with_suffix(CACHE_SUFFIX)
+
+def _source_key(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+def code_version() -> str:
+    """Hash of the lexicon compiler's source, so a code change invalidates the cache."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted({Path(__file__)} | {Path(module.__file__) for module in _COMPILER_MODULES}):
+            digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+def compile_lexicon(path: Path) -> Lexicon:
+    """
+    Load a lexicon, using the on-disk compiled cache when it is up to date.
+
+    Args:
+        path: Lexicon JSON file
+
+    Returns:
+        Compiled Lexicon
+    """
+    path = Path(path)
+    source_key = _source_key(path)
+    version = code_version()
+    cache_path = _cache_path(path)
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('version') == version and cached.get('source') == source_key:
+            return cached['lexicon']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable lexicon cache {cache_path}: {e}")
+
+    lexicon = Lexicon.from_file(path)
+    try:
+        # Write then rename so concurrent processes never read a partial cache
+        temp_path = cache_path.with_name(cache_path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump({'version': version, 'source': source_key, 'lexicon': lexicon}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        temp_path.replace(cache_path)
+    except OSError as e:
+        logger.info(f"Could not write lexicon cache {cache_path}: {e}")
+    return lexicon
+
+_lexicons: Dict[str, Lexicon] = {}
+_lexicons_lock = threading.Lock()
+
+def get_lexicon(path: Optional[str] = None) -> Lexicon:
+    """
+    Get the shared lexicon, compiling (or loading from cache) on first use.
+
+    Args:
+        path: Lexicon JSON file (defaults to LEXICON_FILE, then lexicon.json
+            next to this module)
+
+    Returns:
+        Shared Lexicon; an empty one if the file is missing or invalid
+    """
+    if path is None:
+        from config import config
+        path = config.get('lexicon_file') or DEFAULT_LEXICON
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = Path(__file__).parent / resolved
+    key = str(resolved)
+
+    lexicon = _lexicons.get(key)
+    if lexicon is not None:
+        return lexicon
+    with _lexicons_lock:
+        lexicon = _lexicons.get(key)
+        if lexicon is None:
+            try:
+                lexicon = compile_lexicon(resolved)
+            except FileNotFoundError:
+                logger.error(f"Lexicon file not found: {resolved}")
+                lexicon = Lexicon({}, {})
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid JSON in lexicon file: {e}")
+                lexicon = Lexicon({}, {})
+            _lexicons[key] = lexicon
+        return lexicon
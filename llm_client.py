@@ -0,0 +1,157 @@
+"""
+Shared LLM client factory for every front end.
+
+Chat models are created from Config (OPENAI_MODEL, OPENAI_TEMPERATURE,
+OPENAI_MAX_TOKENS, OPENAI_BASE_URL, timeouts and retries) and reuse one
+keep-alive HTTP connection pool per process instead of opening a new pool per
+model. Models with the same settings are shared, and prompt | llm chains are
+composed once per (prompt, model) pair via get_chain().
+"""
+import os
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Any, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+CHAIN_CACHE_SIZE = 64
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_llms: Dict[Tuple, ChatOpenAI] = {}
+_chains = LRUCache(maxsize=CHAIN_CACHE_SIZE)
+
+def _settings(settings: Optional[Any]) -> Any:
+    if settings is None:
+        from config import config
+        return config
+    return settings
+
+def _limits(settings: Any) -> httpx.Limits:
+    pool_size = settings.get('openai_pool_size', 20)
+    return httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                        keepalive_expiry=settings.get('openai_keepalive_expiry', 30.0))
+
+def _timeout(settings: Any) -> httpx.Timeout:
+    return httpx.Timeout(settings.get('openai_timeout', 30.0),
+                         connect=settings.get('openai_connect_timeout', 5.0))
+
+def get_http_client(settings: Optional[Any] = None) -> httpx.Client:
+    """Get the process-wide HTTP client (keep-alive pool) used by all chat models."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            settings = _settings(settings)
+            _http_client = httpx.Client(limits=_limits(settings), timeout=_timeout(settings))
+        return _http_client
+
+def get_async_http_client(settings: Optional[Any] = None) -> httpx.AsyncClient:
+    """Get the process-wide async HTTP client used by ainvoke/astream."""
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            settings = _settings(settings)
+            _async_http_client = httpx.AsyncClient(limits=_limits(settings), timeout=_timeout(settings))
+        return _async_http_client
+
+def create_llm(api_key: Optional[str] = None, settings: Optional[Any] = None, **overrides) -> ChatOpenAI:
+    """
+    Get a chat model configured from Config, sharing the process HTTP pool.
+
+    OpenRouter keys (sk-or-v1...) are routed to OpenRouter automatically.
+    Calls with the same effective settings return the same model instance.
+
+    Args:
+        api_key: API key (defaults to OPENAI_API_KEY)
+        settings: Config-like mapping (defaults to the global config)
+        **overrides: model, temperature, max_tokens or base_url to use
+            instead of the configured value
+
+    Returns:
+        Shared ChatOpenAI instance
+    """
+    settings = _settings(settings)
+    api_key = api_key or settings.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
+    model = overrides.get('model') or settings.get('openai_model', 'gpt-3.5-turbo')
+    temperature = overrides.get('temperature', settings.get('openai_temperature', 0.6))
+    max_tokens = overrides.get('max_tokens', settings.get('openai_max_tokens', 300))
+    base_url = overrides.get('base_url') or settings.get('openai_base_url') or None
+    if api_key and api_key.startswith('sk-or-v1') and not base_url:
+        base_url = OPENROUTER_BASE_URL
+    if base_url == OPENROUTER_BASE_URL and '/' not in model:
+        # OpenRouter model ids are namespaced by provider
+        model = f"openai/{model}"
+
+    key = (api_key, model, temperature, max_tokens, base_url)
+    llm = _llms.get(key)
+    if llm is not None:
+        return llm
+    http_client = get_http_client(settings)
+    async_http_client = get_async_http_client(settings)
+    with _lock:
+        llm = _llms.get(key)
+        if llm is None:
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=settings.get('openai_max_retries', 2),
+                http_client=http_client,
+                http_async_client=async_http_client
+            )
+            _llms[key] = llm
+            logger.info(f"Created chat model {model} (temperature={temperature}, max_tokens={max_tokens})")
+        return llm
+
+def get_chain(prompt: Any, llm: Any) -> Any:
+    """Get the prompt | llm chain for a pair, composing it only on first use."""
+    key = (id(prompt), id(llm))
+    entry = _chains.get(key)
+    # The entry keeps prompt and llm alive, so their ids cannot be reused while cached
+    if entry is None or entry[0] is not prompt or entry[1] is not llm:
+        entry = (prompt, llm, prompt | llm)
+        _chains.put(key, entry)
+    return entry[2]
+
+def _close_async_client(client: httpx.AsyncClient):
+    """Close an async client on the loop its connections belong to, if possible."""
+    # Imported here: pipeline builds on this module
+    from pipeline import current_background_loop
+    background = current_background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    try:
+        if background is not None and running is not background.loop:
+            # Pipelines run on the background loop, so its connections live there
+            background.submit(client.aclose()).result(timeout=5.0)
+        elif running is not None:
+            # Cannot block inside a running loop; close once control returns to it
+            running.create_task(client.aclose())
+        else:
+            asyncio.run(client.aclose())
+    except Exception as e:
+        logger.warning(f"Could not close the async HTTP client cleanly: {e}")
+
+def close_clients():
+    """Close the shared HTTP clients and forget cached models and chains."""
+    global _http_client, _async_http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        async_client = _async_http_client
+        _http_client = None
+        _async_http_client = None
+        _llms.clear()
+        _chains.clear()
+    if async_client is not None:
+        _close_async_client(async_client)
@@ -0,0 +1,86 @@
+"""Small thread-safe LRU cache with hit/miss counters."""
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Bounded least-recently-used mapping.
+
+    Unlike functools.lru_cache it can be keyed on normalized values, cleared
+    or replaced per corpus, and it exposes its counters via stats().
+
+    With weigh set, entries are also evicted while their total weight (e.g.
+    the number of ids they hold) exceeds maxweight, so a few large values
+    cannot pin an unbounded amount of memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, weigh: Optional[Callable[[Any], int]] = None,
+                 maxweight: int = 0):
+        self.maxsize = maxsize
+        self.weigh = weigh
+        self.maxweight = maxweight
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._weights: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value (marking it most recently used), counting the hit or miss."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full."""
+        if self.maxsize <= 0:
+            return
+        weight = self.weigh(value) if self.weigh is not None else 0
+        if self.weigh is not None and weight > self.maxweight:
+            return
+        with self._lock:
+            self.weight += weight - self._weights.get(key, 0)
+            self._data[key] = value
+            self._weights[key] = weight
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or self.weight > self.maxweight:
+                evicted, _ = self._data.popitem(last=False)
+                self.weight -= self._weights.pop(evicted)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Get a cached value, or compute and store it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Computed outside the lock; concurrent misses may compute twice, which is harmless
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get hits, misses, current size and capacity (and weight, when weighed)."""
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+            if self.weigh is not None:
+                stats.update(weight=self.weight, maxweight=self.maxweight)
+            return stats
+
+    def __len__(self) -> int:
+        return len(self._data)
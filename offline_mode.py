@@ -3,12 +3,14 @@ Offline Bible Motivator - Works without OpenAI API
 Provides encouragement using pre-written responses and Bible verses
 """
 import random
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt
-from utils import VerseManager, extract_keywords_from_input
+from utils import get_verse_manager, extract_keywords_from_input
+from config import config
 
 console = Console()
 
@@ -16,7 +18,7 @@ class OfflineBibleMotivator:
     """Offline version that provides encouragement without AI."""
     
     def __init__(self):
-        self.verse_manager = VerseManager()
+        self.verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
         self.response_templates = self._load_response_templates()
         
     def _load_response_templates(self) -> Dict[str, List[str]]:
@@ -78,7 +80,7 @@ class OfflineBibleMotivator:
             category = "strength"
         
         # Get appropriate verse
-        verse = self.verse_manager.pick_verse(keywords=keywords)
+        verse = self.verse_manager.pick_verse(keywords=keywords, query=user_input)
         
         # Select response template
         templates = self.response_templates.get(category, self.response_templates['general'])
@@ -184,6 +186,21 @@ class OfflineBibleMotivator:
             )
         )
 
+_offline_motivator: Optional[OfflineBibleMotivator] = None
+_offline_motivator_lock = threading.Lock()
+
+def get_offline_response(user_input: str, mode: str = "general") -> str:
+    """
+    Template-based reply from a shared OfflineBibleMotivator.
+    
+    Used by the online apps when an LLM call is shed by the rate limiter.
+    """
+    global _offline_motivator
+    with _offline_motivator_lock:
+        if _offline_motivator is None:
+            _offline_motivator = OfflineBibleMotivator()
+    return _offline_motivator.get_response(user_input, mode)
+
 def main():
     """Entry point for offline mode."""
     try:
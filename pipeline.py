@@ -0,0 +1,148 @@
+"""
+Asyncio-native response pipeline shared by the front ends.
+
+keyword extraction -> verse pick -> prompt | llm via ainvoke/astream, with
+the response caches in front of the model call. Keyword extraction and verse
+picking are cached, microsecond-scale work and run inline, as do in-memory
+cache hits; SQLite and semantic cache work runs in worker threads and the
+model call awaits, so a single event loop can keep hundreds of conversations
+in flight (bounded by OPENAI_POOL_SIZE connections).
+
+Front ends that are not async themselves (the Tk GUI) submit coroutines to
+the process-wide background loop from get_background_loop(). Use one loop
+per process: the shared async HTTP client's connections belong to the loop
+that opened them.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator, Coroutine
+from prompts import get_prompt_for_context
+from utils import VerseManager, get_verse_manager, extract_keywords_from_input, get_mode_keywords, verse_seed
+from response_cache import ResponseCache, cached_ainvoke, cached_astream
+from semantic_cache import SemanticCache
+from rate_limiter import RateLimitExceeded
+from offline_mode import get_offline_response
+
+logger = logging.getLogger(__name__)
+
+class ResponsePipeline:
+    """
+    Turns a user message into a model response.
+
+    Args:
+        llm: Chat model
+        verse_manager: Verse source (defaults to the shared manager for VERSES_FILE)
+        cache: Exact response cache (defaults to the shared one)
+        semantic: Near-duplicate cache (defaults to the shared one)
+    """
+
+    def __init__(self, llm: Any, verse_manager: Optional[VerseManager] = None,
+                 cache: Optional[ResponseCache] = None, semantic: Optional[SemanticCache] = None):
+        if verse_manager is None:
+            from config import config
+            verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
+        self.llm = llm
+        self.verse_manager = verse_manager
+        self.cache = cache
+        self.semantic = semantic
+
+    def prepare(self, message: str, context: str = 'general', ranked: bool = True,
+                default_keywords: Optional[List[str]] = None) -> Tuple[Any, Dict[str, str]]:
+        """
+        Pick the verse and prompt for a message.
+
+        Args:
+            message: User message
+            context: Prompt context / conversation mode (e.g. 'programmer')
+            ranked: Pick among the best-scoring verses instead of any match
+            default_keywords: Keywords to use when the message has none
+
+        Returns:
+            (prompt template, prompt inputs)
+        """
+        keywords = extract_keywords_from_input(message, context=context)
+        keywords.extend(get_mode_keywords(context))
+        if not keywords and default_keywords:
+            keywords = list(default_keywords)
+        verse = self.verse_manager.pick_verse(keywords=keywords, ranked=ranked, query=message,
+                                              seed=verse_seed(message, context))
+        return get_prompt_for_context(context), {
+            'user_input': message,
+            'verse_ref': verse['ref'],
+            'verse_text': verse['text']
+        }
+
+    async def respond(self, message: str, context: str = 'general', session: Optional[str] = None,
+                      **options) -> str:
+        """
+        Generate the full response for a message.
+
+        Calls shed by the rate limiter are answered by the offline responder;
+        other errors propagate to the caller.
+        """
+        prompt, inputs = self.prepare(message, context, **options)
+        try:
+            return await cached_ainvoke(prompt, self.llm, inputs, cache=self.cache, semantic=self.semantic,
+                                        session=session, mode=context)
+        except RateLimitExceeded:
+            return get_offline_response(message, context)
+
+    async def stream(self, message: str, context: str = 'general', session: Optional[str] = None,
+                     **options) -> AsyncIterator[str]:
+        """Stream the response for a message as text chunks, shedding to the offline responder like respond()."""
+        prompt, inputs = self.prepare(message, context, **options)
+        try:
+            async for chunk in cached_astream(prompt, self.llm, inputs, cache=self.cache,
+                                              semantic=self.semantic, session=session, mode=context):
+                yield chunk
+        except RateLimitExceeded:
+            # Shedding happens before the model call, so nothing was streamed yet
+            yield get_offline_response(message, context)
+
+    async def respond_many(self, messages: List[str], context: str = 'general', **options) -> List[Any]:
+        """
+        Respond to many messages concurrently.
+
+        Returns:
+            Responses in input order; a failed message yields its exception
+        """
+        return await asyncio.gather(*(self.respond(message, context, **options) for message in messages),
+                                    return_exceptions=True)
+
+class BackgroundLoop:
+    """An asyncio event loop running forever in a daemon thread."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='response-pipeline', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5.0)
+
+_background_loop: Optional[BackgroundLoop] = None
+_background_loop_lock = threading.Lock()
+
+def get_background_loop() -> BackgroundLoop:
+    """Get the process-wide background event loop, starting it on first use."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+        return _background_loop
+
+def current_background_loop() -> Optional[BackgroundLoop]:
+    """Get the background event loop if it was started, without starting it."""
+    return _background_loop
@@ -1,25 +1,39 @@
 """A CLI app for programmers who need motivation — pairs technical empathy with Bible verses."""
 import os
 import sys
+import json
+import time
+import asyncio
 import click
-from typing import Optional
+from collections import deque
+from typing import Optional, Iterator, Iterable, Callable, Dict, Any, List, Deque
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from langchain_openai import ChatOpenAI
-from prompts import get_prompt_for_context
-from utils import VerseManager, extract_keywords_from_input
+from utils import get_verse_manager
+from response_cache import cached_invoke
+from llm_client import create_llm
+from pipeline import ResponsePipeline
+from rate_limiter import RateLimitExceeded
+from offline_mode import get_offline_response
+from config import config
 from dotenv import load_dotenv
 
 console = Console()
+# Errors and batch summaries, kept off stdout so --batch output stays valid JSONL
+err_console = Console(stderr=True)
+
+FALLBACK_MOTIVATION = ("Every developer faces challenges — it's part of the journey. 'Be strong and of a good courage; be not afraid, neither be thou dismayed: for the LORD thy God is with thee whithersoever thou goest.' (Joshua 1:9) Take a break, breathe, and remember that every expert was once a beginner.")
 
 class ProgrammerMotivator:
     """Motivational support specifically designed for developers."""
     
     def __init__(self):
-        self.verse_manager = VerseManager()
+        self.verse_manager = get_verse_manager(config.get('verses_file'), backend=config.get('retrieval_backend'))
         self.llm: Optional[ChatOpenAI] = None
         self._setup_llm()
+        self.pipeline = ResponsePipeline(self.llm, self.verse_manager)
     
     def _setup_llm(self):
         """Initialize the LLM with error handling."""
@@ -31,11 +45,7 @@ class ProgrammerMotivator:
             sys.exit(1)
         
         try:
-            self.llm = ChatOpenAI(
-                temperature=0.5,
-                model="gpt-3.5-turbo",
-                api_key=api_key
-            )
+            self.llm = create_llm(api_key)
         except Exception as e:
             console.print(f"[red]Error initializing OpenAI: {e}[/red]")
             sys.exit(1)
@@ -43,55 +53,119 @@ class ProgrammerMotivator:
     def get_motivation(self, issue: str, topic: Optional[str] = None) -> str:
         """Generate motivational response for programmer issues."""
         try:
-            # Map common programmer issues to verse topics
-            programmer_keywords = {
-                'bug': ['patience', 'strength'],
-                'stuck': ['help', 'strength'],
-                'imposter': ['assurance', 'strength'],
-                'overwhelmed': ['peace', 'rest'],
-                'deadline': ['peace', 'strength'],
-                'frustrated': ['patience', 'peace'],
-                'tired': ['rest', 'strength'],
-                'burnout': ['rest', 'peace'],
-                'failure': ['hope', 'strength'],
-                'rejected': ['assurance', 'hope'],
-                'difficult': ['strength', 'help'],
-                'complex': ['help', 'strength'],
-            }
-            
-            # Extract keywords from the issue
-            keywords = extract_keywords_from_input(issue)
-            
-            # Add programmer-specific keywords
-            for word, tags in programmer_keywords.items():
-                if word in issue.lower():
-                    keywords.extend(tags)
+            # General and programmer-specific lexicon matches, defaulting to strength
+            prompt, inputs = self.pipeline.prepare(issue, 'programmer', ranked=False, default_keywords=['strength'])
             
-            # Default to strength if no specific keywords found
-            if not keywords:
-                keywords = ['strength']
+            # Identical prompts are answered from the shared response cache
+            return cached_invoke(prompt, self.llm, inputs, mode='programmer')
             
-            verse = self.verse_manager.pick_verse(keywords=keywords)
-            
-            # Use modern LangChain pattern
-            prompt = get_prompt_for_context("programmer")
-            chain = prompt | self.llm
-            response = chain.invoke({
-                'user_input': issue,
-                'verse_ref': verse['ref'],
-                'verse_text': verse['text']
-            })
-            return response.content.strip()
+        except RateLimitExceeded:
+            return get_offline_response(issue, 'programmer')
+        except Exception as e:
+            err_console.print(f"[red]Error generating motivation: {e}[/red]")
+            return FALLBACK_MOTIVATION
+    
+    async def get_motivation_async(self, issue: str, topic: Optional[str] = None) -> str:
+        """Async get_motivation, awaiting the model through the response pipeline."""
+        try:
+            return await self.pipeline.respond(issue, 'programmer', ranked=False, default_keywords=['strength'])
             
         except Exception as e:
-            console.print(f"[red]Error generating motivation: {e}[/red]")
-            return ("Every developer faces challenges — it's part of the journey. 'Be strong and of a good courage; be not afraid, neither be thou dismayed: for the LORD thy God is with thee whithersoever thou goest.' (Joshua 1:9) Take a break, breathe, and remember that every expert was once a beginner.")
+            err_console.print(f"[red]Error generating motivation: {e}[/red]")
+            return FALLBACK_MOTIVATION
+
+def read_issues(path: str) -> Iterator[str]:
+    """
+    Read batch issues lazily: one per line, or JSON Lines.
+    
+    A JSON line may be a string or an object with an "issue" (or "text" /
+    "message") field; other lines are taken as plain text. Blank lines are
+    skipped; JSON records without issue text are skipped with a warning
+    naming the line, since output indices then no longer match input lines.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in '{"':
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield line
+                    continue
+                if isinstance(record, dict):
+                    record = next((record[key] for key in ('issue', 'text', 'message') if record.get(key)), '')
+                if isinstance(record, str) and record.strip():
+                    yield record.strip()
+                else:
+                    err_console.print(f"[yellow]Skipping line {number} of {path}: "
+                                      f"no issue, text or message[/yellow]")
+                continue
+            yield line
+
+async def run_batch(motivator: 'ProgrammerMotivator', issues: Iterable[str],
+                    write: Callable[[Dict[str, Any]], None], concurrency: int = 8) -> Dict[str, Any]:
+    """
+    Generate motivation for many issues with at most `concurrency` model calls in flight.
+    
+    Results are written in input order as soon as every earlier issue is done,
+    so output streams while later issues are still running. Issues are read
+    lazily and at most a small window of them is pending at a time.
+    
+    Args:
+        motivator: Object providing get_motivation_async(issue)
+        issues: Issue texts
+        write: Called with each result record (index, issue, response, latency_ms)
+        concurrency: Maximum concurrent model calls
+    
+    Returns:
+        Summary with count, total seconds and mean/max latency in milliseconds
+    """
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    window = concurrency * 4
+    pending: Deque[asyncio.Task] = deque()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    
+    async def motivate(index: int, issue: str) -> Dict[str, Any]:
+        async with semaphore:
+            call_started = time.perf_counter()
+            response = await motivator.get_motivation_async(issue)
+            latency_ms = (time.perf_counter() - call_started) * 1000
+        return {'index': index, 'issue': issue, 'response': response, 'latency_ms': round(latency_ms, 1)}
+    
+    def emit(record: Dict[str, Any]):
+        latencies.append(record['latency_ms'])
+        write(record)
+    
+    for index, issue in enumerate(issues):
+        pending.append(asyncio.ensure_future(motivate(index, issue)))
+        if len(pending) >= window:
+            emit(await pending.popleft())
+    while pending:
+        emit(await pending.popleft())
+    
+    return {
+        'count': len(latencies),
+        'seconds': round(time.perf_counter() - started, 3),
+        'mean_latency_ms': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        'max_latency_ms': max(latencies, default=0.0),
+    }
 
 @click.command()
 @click.option('--issue', '-i', help='Describe what\'s bothering you as a programmer')
 @click.option('--interactive', '-I', is_flag=True, help='Run in interactive mode')
 @click.option('--quick', '-q', is_flag=True, help='Get quick motivation for general coding struggles')
-def main(issue: Optional[str], interactive: bool, quick: bool):
+@click.option('--batch', '-b', 'batch_file', type=click.Path(exists=True, dir_okay=False),
+              help='File of issues (one per line or JSONL) to answer in bulk')
+@click.option('--output', '-o', default='-', type=click.Path(dir_okay=False, allow_dash=True),
+              help='JSONL output file for --batch (default: stdout)')
+@click.option('--concurrency', '-c', type=click.IntRange(min=1), default=None,
+              help='Maximum concurrent requests for --batch (default: BATCH_CONCURRENCY)')
+def main(issue: Optional[str], interactive: bool, quick: bool, batch_file: Optional[str],
+         output: str, concurrency: Optional[int]):
     """
     Python Developer Motivator — Biblical encouragement for coding challenges.
     
@@ -99,9 +173,24 @@ def main(issue: Optional[str], interactive: bool, quick: bool):
       python_motivator.py -i "stuck on a complex algorithm"
       python_motivator.py --quick
       python_motivator.py --interactive
+      python_motivator.py --batch standup.txt -o encouragement.jsonl -c 8
     """
     motivator = ProgrammerMotivator()
     
+    if batch_file:
+        concurrency = concurrency or config.get('batch_concurrency')
+        with click.open_file(output, 'w', encoding='utf-8') as out:
+            def write(record: Dict[str, Any]):
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+            summary = asyncio.run(run_batch(motivator, read_issues(batch_file), write, concurrency))
+        err_console.print(
+            f"[green]Answered {summary['count']} issues in {summary['seconds']}s "
+            f"(concurrency {concurrency}, mean latency {summary['mean_latency_ms']} ms, "
+            f"max {summary['max_latency_ms']} ms)[/green]"
+        )
+        return
+    
     if quick:
         issue = "I'm feeling discouraged with my coding progress"
     elif interactive:
@@ -0,0 +1,266 @@
+"""
+Client-side rate limiting for LLM calls.
+
+Every model call first acquires budget from two token buckets: one for
+requests per minute (OPENAI_RPM) and one for tokens per minute (OPENAI_TPM).
+A call's token cost is estimated as its prompt length / 4 plus
+OPENAI_MAX_TOKENS for the completion. Buckets refill continuously and allow
+bursts of BURST_SECONDS worth of budget.
+
+Waiting calls are queued per session and served round-robin, so one busy
+session cannot starve the others. A call whose estimated queue wait exceeds
+RATE_LIMIT_DEADLINE, or that is still queued at the deadline, is shed with
+RateLimitExceeded so the front end can answer from the offline responder
+instead of stalling or hitting provider 429s.
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Any, Callable, Deque
+
+logger = logging.getLogger(__name__)
+
+BURST_SECONDS = 10.0
+DEFAULT_SESSION = 'default'
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is shed because its queue wait would exceed the deadline."""
+
+class TokenBucket:
+    """Continuously refilling budget of `rate_per_minute`, holding at most `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * BURST_SECONDS)
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` has accumulated (0 if it is available now)."""
+        self._refill()
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+    def consume(self, amount: float):
+        """Take `amount` (capped at capacity) from the bucket; may go negative on races."""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class _Request:
+    __slots__ = ('session', 'tokens', 'future', 'enqueued')
+
+    def __init__(self, session: str, tokens: float, enqueued: float):
+        self.session = session
+        self.tokens = tokens
+        self.future: Future = Future()
+        self.enqueued = enqueued
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute scheduler with fair queueing.
+
+    Args:
+        rpm: Requests per minute
+        tpm: Estimated tokens per minute
+        max_tokens: Completion tokens reserved per call
+        deadline: Longest queue wait in seconds before a call is shed
+        clock: Monotonic clock (for tests)
+    """
+
+    def __init__(self, rpm: float, tpm: float, max_tokens: int = 300, deadline: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, capacity=max(tpm / 60.0 * BURST_SECONDS, max_tokens * 2), clock=clock)
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        self.clock = clock
+        self.granted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # Session -> its waiting requests; the order of sessions is the round-robin ring
+        self._queues: 'OrderedDict[str, Deque[_Request]]' = OrderedDict()
+        self._queued_tokens = 0.0
+        self._queued_requests = 0
+        self._condition = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def estimate_tokens(self, prompt_text: str) -> int:
+        """Estimate a call's token cost: ~4 characters per prompt token plus the completion budget."""
+        return len(prompt_text) // 4 + self.max_tokens
+
+    def _estimated_wait(self, tokens: float) -> float:
+        """Seconds until everything queued plus this call fits in both buckets."""
+        return max(self.requests.wait_time(self._queued_requests + 1),
+                   self.tokens.wait_time(self._queued_tokens + tokens))
+
+    def _enqueue(self, session: str, prompt_text: str) -> _Request:
+        tokens = self.estimate_tokens(prompt_text)
+        with self._condition:
+            wait = self._estimated_wait(tokens)
+            if wait > self.deadline:
+                self.shed += 1
+                logger.warning(f"Shedding LLM call for session {session}: estimated wait {wait:.1f}s "
+                               f"exceeds {self.deadline:.1f}s")
+                raise RateLimitExceeded(f"Estimated wait {wait:.1f}s exceeds the {self.deadline:.1f}s deadline")
+            request = _Request(session, tokens, self.clock())
+            self._queues.setdefault(session, deque()).append(request)
+            self._queued_requests += 1
+            self._queued_tokens += tokens
+            self._dispatch()
+            if not request.future.done():
+                self._ensure_dispatcher()
+                self._condition.notify()
+            return request
+
+    def _dispatch(self) -> Optional[float]:
+        """
+        Grant queued requests round-robin across sessions while both buckets allow.
+
+        Called with the condition held. Returns seconds until the next request
+        could be granted, or None when nothing is queued.
+        """
+        while self._queues:
+            session, queue = next(iter(self._queues.items()))
+            request = queue[0]
+            wait = max(self.requests.wait_time(1),
+                       self.tokens.wait_time(min(request.tokens, self.tokens.capacity)))
+            if wait > 0:
+                return wait
+            self.requests.consume(1)
+            self.tokens.consume(request.tokens)
+            queue.popleft()
+            self._queued_requests -= 1
+            self._queued_tokens -= request.tokens
+            # The session goes to the back of the ring (or leaves it when empty)
+            del self._queues[session]
+            if queue:
+                self._queues[session] = queue
+            waited = self.clock() - request.enqueued
+            self.granted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            request.future.set_result(waited)
+        return None
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._run_dispatcher, name='rate-limiter', daemon=True)
+            self._dispatcher.start()
+
+    def _run_dispatcher(self):
+        with self._condition:
+            while True:
+                delay = self._dispatch()
+                if delay is None and not self._queues:
+                    # Idle: exit; the next enqueue restarts the thread
+                    self._dispatcher = None
+                    return
+                self._condition.wait(delay)
+
+    def _abandon(self, request: _Request) -> bool:
+        """Remove a timed-out request from its queue; False if it was granted meanwhile."""
+        with self._condition:
+            if request.future.done():
+                return False
+            queue = self._queues.get(request.session)
+            if queue is not None and request in queue:
+                queue.remove(request)
+                if not queue:
+                    del self._queues[request.session]
+                self._queued_requests -= 1
+                self._queued_tokens -= request.tokens
+            request.future.cancel()
+            self.shed += 1
+            logger.warning(f"Shedding LLM call for session {request.session}: still queued after "
+                           f"{self.deadline:.1f}s")
+            return True
+
+    def acquire(self, prompt_text: str, session: Optional[str] = None) -> float:
+        """
+        Wait for budget for one call (blocking).
+
+        Args:
+            prompt_text: Rendered prompt, used to estimate the token cost
+            session: Conversation the call belongs to, for fair queueing
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            RateLimitExceeded: If the call is shed
+        """
+        request = self._enqueue(session or DEFAULT_SESSION, prompt_text)
+        try:
+            return request.future.result(timeout=self.deadline)
+        except FutureTimeoutError:
+            if self._abandon(request):
+                raise RateLimitExceeded(f"Still queued after the {self.deadline:.1f}s deadline")
+            return request.future.result()
+
+    async def aacquire(self, prompt_text: str, session: Optional[str] = None) -> float:
+        """Async acquire: waits without blocking the event loop."""
+        request = self._enqueue(session or DEFAULT_SESSION, prompt_text)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(request.future)), self.deadline)
+        except asyncio.TimeoutError:
+            if self._abandon(request):
+                raise RateLimitExceeded(f"Still queued after the {self.deadline:.1f}s deadline")
+            return request.future.result()
+        except asyncio.CancelledError:
+            self._abandon(request)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Get granted and shed calls, queue depth and wait times."""
+        with self._condition:
+            return {'granted': self.granted, 'shed': self.shed, 'queued': self._queued_requests,
+                    'sessions_waiting': len(self._queues),
+                    'mean_wait': self.total_wait / self.granted if self.granted else 0.0,
+                    'max_wait': self.max_wait}
+
+def build_rate_limiter(settings: Optional[Any] = None) -> Optional[RateLimiter]:
+    """
+    Build a rate limiter from configuration.
+
+    Args:
+        settings: Config-like mapping (defaults to the global config)
+
+    Returns:
+        RateLimiter, or None if RATE_LIMIT is off
+    """
+    if settings is None:
+        from config import config
+        settings = config
+    if not settings.get('rate_limit', True):
+        return None
+    return RateLimiter(rpm=settings.get('openai_rpm', 500), tpm=settings.get('openai_tpm', 90000),
+                       max_tokens=settings.get('openai_max_tokens', 300),
+                       deadline=settings.get('rate_limit_deadline', 10.0))
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_built = False
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Get the process-wide rate limiter in front of all LLM calls, building it on first use."""
+    global _rate_limiter, _rate_limiter_built
+    if _rate_limiter_built:
+        return _rate_limiter
+    with _rate_limiter_lock:
+        if not _rate_limiter_built:
+            _rate_limiter = build_rate_limiter()
+            _rate_limiter_built = True
+        return _rate_limiter
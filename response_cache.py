@@ -0,0 +1,640 @@
+"""
+Response cache in front of the LangChain chains.
+
+Responses are keyed on the fully rendered prompt plus the model settings that
+change the output (model, temperature, max_tokens, endpoint), so identical
+(prompt, input, verse) triples are answered without another API call.
+Near-duplicate messages are handled by the semantic_cache tier, consulted by
+cached_invoke after an exact miss, and identical calls still in flight are
+coalesced into one model call by single_flight.
+
+A ResponseCache checks a list of tiers in order and backfills the faster
+tiers on a hit further down:
+
+- MemoryTier: per-process LRU with a time-to-live
+- SQLiteTier: on-disk store shared by every front end and process, with its
+  own TTL and entry limit
+
+Any object with get/put/clear/stats can be used as a tier; tiers that may
+block (disk, network) must not set ``blocking = False``, because the async
+helpers only call non-blocking tiers on the event loop and hand everything
+else to a worker thread. Oversized responses are never stored, and every
+tier counts its evictions and expirations.
+"""
+import time
+import asyncio
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple, NamedTuple, Iterator, AsyncIterator
+from semantic_cache import SemanticCache, get_semantic_cache
+from llm_client import get_chain
+from single_flight import SingleFlight, get_single_flight, wait_for_leader
+from rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+class MemoryTier:
+    """In-memory LRU tier whose entries expire after ttl seconds."""
+
+    # Lookups are dict operations, safe to run on an event loop
+    blocking = False
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (expiry time or None, response)
+        self._data: 'OrderedDict[str, Tuple[Optional[float], str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a live response, dropping it if it has expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: str):
+        """Store a response, evicting the least recently used entries when full."""
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit, miss, eviction and expiration counts plus size and capacity."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'size': len(self._data), 'maxsize': self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SQLiteTier:
+    """
+    On-disk tier in a SQLite database.
+
+    Entries expire ttl seconds after they were stored; beyond max_entries the
+    least recently read entries are evicted. The database runs in WAL mode so
+    the CLI, GUI and Streamlit apps can share one file.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, ttl: Optional[float] = 7 * 86400.0, max_entries: int = 10000):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        # One connection shared by all threads, serialized by the lock
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError as e:
+            logger.info(f"Response cache {self.path} not using WAL: {e}")
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a live response, deleting it if it has expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.ttl and row[1] + self.ttl <= now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """Store a response, evicting the least recently read entries beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            excess = self._count() - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY accessed LIMIT ?)', (excess,)
+                )
+                self.evictions += excess
+
+    def purge_expired(self) -> int:
+        """Delete every expired entry; returns how many were removed."""
+        if not self.ttl:
+            return 0
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM responses WHERE created <= ?',
+                                         (time.time() - self.ttl,)).rowcount
+            self.expirations += removed
+            return removed
+
+    def _count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def clear(self):
+        """Delete all entries and reset the counters."""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit, miss, eviction and expiration counts plus size and capacity."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'size': self._count(), 'maxsize': self.max_entries}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+class ResponseCache:
+    """
+    Tiered cache of LLM responses.
+
+    Tiers are checked in order; a hit in a later (slower) tier is copied into
+    the earlier ones. Tier errors (e.g. a locked or corrupt database) are
+    logged and treated as misses so caching never breaks a response.
+    """
+
+    def __init__(self, tiers: List[Any], max_entry_bytes: int = 16384):
+        self.tiers = tiers
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def inline_tiers(self) -> int:
+        """Number of leading tiers that never block (see get(blocking=False))."""
+        count = 0
+        for tier in self.tiers:
+            if getattr(tier, 'blocking', True):
+                break
+            count += 1
+        return count
+
+    def get(self, key: str, first: int = 0, blocking: bool = True) -> Optional[str]:
+        """
+        Get a cached response from the first tier that has it.
+
+        Args:
+            key: Cache key
+            first: Index of the first tier to check (earlier tiers are still backfilled)
+            blocking: If False, stop before the first blocking tier; such a
+                partial miss is not counted, the caller follows up with
+                get(key, first=inline_tiers) off the event loop
+        """
+        for position, tier in enumerate(self.tiers[first:], first):
+            if not blocking and getattr(tier, 'blocking', True):
+                return None
+            try:
+                value = tier.get(key)
+            except Exception as e:
+                logger.warning(f"Response cache tier {type(tier).__name__} failed on get: {e}")
+                continue
+            if value is not None:
+                for faster in self.tiers[:position]:
+                    self._put_tier(faster, key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str) -> bool:
+        """
+        Store a response in every tier.
+
+        Returns:
+            False if the response exceeds max_entry_bytes and was not stored
+        """
+        if self.max_entry_bytes and len(value.encode('utf-8')) > self.max_entry_bytes:
+            with self._lock:
+                self.rejected += 1
+            return False
+        for tier in self.tiers:
+            self._put_tier(tier, key, value)
+        with self._lock:
+            self.stores += 1
+        return True
+
+    def _put_tier(self, tier: Any, key: str, value: str):
+        try:
+            tier.put(key, value)
+        except Exception as e:
+            logger.warning(f"Response cache tier {type(tier).__name__} failed on put: {e}")
+
+    def clear(self):
+        """Clear every tier and reset the counters."""
+        for tier in self.tiers:
+            tier.clear()
+        with self._lock:
+            self.hits = self.misses = self.stores = self.rejected = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get overall counters plus each tier's stats keyed by tier class name."""
+        with self._lock:
+            stats: Dict[str, Any] = {'hits': self.hits, 'misses': self.misses,
+                                     'stores': self.stores, 'rejected': self.rejected}
+        for tier in self.tiers:
+            try:
+                stats[type(tier).__name__] = tier.stats()
+            except Exception as e:
+                logger.warning(f"Response cache tier {type(tier).__name__} failed on stats: {e}")
+        return stats
+
+def model_settings(llm: Any) -> Dict[str, Any]:
+    """
+    Get the settings of a chat model that affect its output.
+
+    Args:
+        llm: LangChain chat model (attributes missing on other models are None)
+
+    Returns:
+        Model name, temperature, max_tokens and API base URL
+    """
+    return {
+        'model': getattr(llm, 'model_name', None) or getattr(llm, 'model', None),
+        'temperature': getattr(llm, 'temperature', None),
+        'max_tokens': getattr(llm, 'max_tokens', None),
+        'base_url': getattr(llm, 'openai_api_base', None),
+    }
+
+def cache_key(prompt_text: str, settings: Dict[str, Any]) -> str:
+    """Hash a rendered prompt and model settings into a cache key."""
+    payload = json.dumps({'prompt': prompt_text, 'settings': settings}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_response_cache(settings: Optional[Dict[str, Any]] = None) -> Optional[ResponseCache]:
+    """
+    Build a response cache from configuration.
+
+    Args:
+        settings: Config-like mapping (defaults to the global config)
+
+    Returns:
+        ResponseCache, or None if RESPONSE_CACHE is off
+    """
+    if settings is None:
+        from config import config
+        settings = config
+    if not settings.get('response_cache', True):
+        return None
+
+    ttl = settings.get('response_cache_ttl') or None
+    tiers: List[Any] = [MemoryTier(settings.get('response_cache_size', 256), ttl)]
+    db_path = settings.get('response_cache_db')
+    if db_path:
+        resolved = Path(db_path)
+        if not resolved.is_absolute():
+            resolved = Path(__file__).parent / resolved
+        try:
+            tiers.append(SQLiteTier(str(resolved), ttl, settings.get('response_cache_db_max_entries', 10000)))
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache database {resolved} unavailable, using memory only: {e}")
+    return ResponseCache(tiers, settings.get('response_cache_max_entry_bytes', 16384))
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_built = False
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide response cache shared by all front ends, building it on first use."""
+    global _response_cache, _response_cache_built
+    if _response_cache_built:
+        return _response_cache
+    with _response_cache_lock:
+        if not _response_cache_built:
+            _response_cache = build_response_cache()
+            _response_cache_built = True
+        return _response_cache
+
+def invalidate_response_cache():
+    """Drop the shared response cache so the next use rebuilds it from configuration."""
+    global _response_cache, _response_cache_built
+    with _response_cache_lock:
+        for tier in (_response_cache.tiers if _response_cache else []):
+            if isinstance(tier, SQLiteTier):
+                tier.close()
+        _response_cache = None
+        _response_cache_built = False
+
+class _Lookup(NamedTuple):
+    """Outcome of checking both caches for one chain call."""
+    text: Optional[str]
+    cache: Optional[ResponseCache]
+    key: str
+    semantic: Optional[SemanticCache]
+    scope: Optional[str]
+    message: Optional[str]
+    prompt_text: str
+
+def _lookup(prompt: Any, llm: Any, inputs: Dict[str, Any], cache: Optional[ResponseCache],
+            semantic: Optional[SemanticCache], mode: Optional[str] = None, first_tier: int = 0) -> _Lookup:
+    """Check the exact cache (from first_tier on), then the semantic cache, for a chain call."""
+    if cache is None:
+        cache = get_response_cache()
+    if semantic is None:
+        semantic = get_semantic_cache()
+    settings = model_settings(llm)
+    # Also the single-flight key, so it is computed even with the cache disabled
+    prompt_text = prompt.format(**inputs)
+    key = cache_key(prompt_text, settings)
+    if cache is not None:
+        cached = cache.get(key, first=first_tier)
+        if cached is not None:
+            return _Lookup(cached, cache, key, None, None, None, prompt_text)
+
+    message = inputs.get('user_input')
+    scope = None
+    if semantic is not None and message:
+        # Several modes share one prompt template, so the mode is part of the scope
+        scope = cache_key(f"{mode or 'general'}\n{getattr(prompt, 'template', repr(prompt))}", settings)
+        similar = semantic.lookup(scope, message)
+        if similar is not None:
+            if cache is not None:
+                cache.put(key, similar)
+            return _Lookup(similar, cache, key, None, None, None, prompt_text)
+    return _Lookup(None, cache, key, semantic, scope, message, prompt_text)
+
+async def _alookup(prompt: Any, llm: Any, inputs: Dict[str, Any], cache: Optional[ResponseCache],
+                   semantic: Optional[SemanticCache], mode: Optional[str] = None) -> _Lookup:
+    """
+    Async _lookup that keeps the event loop free.
+
+    Only the in-memory tiers are checked on the loop; the SQLite tier and the
+    semantic cache (keyword extraction and embedding) run in a worker thread,
+    so a slow or locked database never stalls other conversations.
+    """
+    if cache is None:
+        cache = get_response_cache()
+    if semantic is None:
+        semantic = get_semantic_cache()
+    first_tier = 0
+    if cache is not None:
+        prompt_text = prompt.format(**inputs)
+        key = cache_key(prompt_text, model_settings(llm))
+        cached = cache.get(key, blocking=False)
+        if cached is not None:
+            return _Lookup(cached, cache, key, None, None, None, prompt_text)
+        first_tier = cache.inline_tiers
+    if semantic is None and (cache is None or first_tier == len(cache.tiers)):
+        # Nothing left that could block
+        return _lookup(prompt, llm, inputs, cache, semantic, mode, first_tier)
+    # run_in_executor rather than asyncio.to_thread, which needs Python 3.9
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _lookup, prompt, llm, inputs, cache, semantic, mode, first_tier)
+
+def _store(lookup: _Lookup, text: str):
+    """Remember a freshly generated response in both caches."""
+    if not text:
+        return
+    if lookup.cache is not None:
+        lookup.cache.put(lookup.key, text)
+    if lookup.scope is not None:
+        lookup.semantic.add(lookup.scope, lookup.message, text)
+
+async def _astore(lookup: _Lookup, text: str):
+    """Async _store: tier writes and the semantic embedding run in a worker thread."""
+    if text:
+        await asyncio.get_running_loop().run_in_executor(None, _store, lookup, text)
+
+def _acquire(lookup: _Lookup, session: Optional[str]):
+    """Wait for rate-limit budget for a model call (raises RateLimitExceeded when shed)."""
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        limiter.acquire(lookup.prompt_text, session)
+
+async def _aacquire(lookup: _Lookup, session: Optional[str]):
+    """Async _acquire."""
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        await limiter.aacquire(lookup.prompt_text, session)
+
+def cached_invoke(prompt: Any, llm: Any, inputs: Dict[str, Any],
+                  cache: Optional[ResponseCache] = None,
+                  semantic: Optional[SemanticCache] = None,
+                  flight: Optional[SingleFlight] = None,
+                  session: Optional[str] = None,
+                  mode: Optional[str] = None) -> str:
+    """
+    Run prompt | llm on inputs, answering from the response caches when possible.
+
+    The exact cache is tried first, then the semantic cache matches the
+    'user_input' message against near-duplicates for the same mode, prompt
+    template and model settings. On a miss, concurrent calls with the same
+    rendered prompt and settings share a single model call, which waits for
+    rate-limit budget first.
+
+    Args:
+        prompt: LangChain prompt template
+        llm: Chat model
+        inputs: Prompt variables
+        cache: Exact cache to use (defaults to the shared response cache)
+        semantic: Near-duplicate cache to use (defaults to the shared semantic cache)
+        flight: Coalescer to use (defaults to the shared one)
+        session: Conversation id for fair rate-limit queueing
+        mode: Conversation mode; semantic matches stay within one mode
+
+    Returns:
+        Stripped response text
+
+    Raises:
+        RateLimitExceeded: If the call is shed by the rate limiter
+    """
+    lookup = _lookup(prompt, llm, inputs, cache, semantic, mode)
+    if lookup.text is not None:
+        return lookup.text
+
+    def generate() -> str:
+        _acquire(lookup, session)
+        response = get_chain(prompt, llm).invoke(inputs)
+        text = getattr(response, 'content', response).strip()
+        _store(lookup, text)
+        return text
+
+    if flight is None:
+        flight = get_single_flight()
+    return flight.do(lookup.key, generate) if flight is not None else generate()
+
+def cached_stream(prompt: Any, llm: Any, inputs: Dict[str, Any],
+                  cache: Optional[ResponseCache] = None,
+                  semantic: Optional[SemanticCache] = None,
+                  flight: Optional[SingleFlight] = None,
+                  session: Optional[str] = None,
+                  mode: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream prompt | llm on inputs as text chunks, using the response caches like cached_invoke.
+
+    A cached response is yielded as a single chunk, as is the result of an
+    identical call already in flight. A streamed response is only cached
+    once the stream completes, so a failure midway (raised to the caller)
+    never stores a partial answer.
+
+    Args:
+        prompt: LangChain prompt template
+        llm: Chat model
+        inputs: Prompt variables
+        cache: Exact cache to use (defaults to the shared response cache)
+        semantic: Near-duplicate cache to use (defaults to the shared semantic cache)
+        flight: Coalescer to use (defaults to the shared one)
+        session: Conversation id for fair rate-limit queueing
+        mode: Conversation mode; semantic matches stay within one mode
+
+    Yields:
+        Response text chunks (leading whitespace dropped)
+    """
+    lookup = _lookup(prompt, llm, inputs, cache, semantic, mode)
+    if lookup.text is not None:
+        yield lookup.text
+        return
+
+    if flight is None:
+        flight = get_single_flight()
+    leader, future = flight.begin(lookup.key) if flight is not None else (True, None)
+    if not leader:
+        yield future.result()
+        return
+
+    parts: List[str] = []
+    error: Optional[BaseException] = RuntimeError("Stream abandoned before completion")
+    try:
+        _acquire(lookup, session)
+        for chunk in get_chain(prompt, llm).stream(inputs):
+            text = getattr(chunk, 'content', chunk)
+            if not parts:
+                text = text.lstrip()
+            if text:
+                parts.append(text)
+                yield text
+        error = None
+    except Exception as e:
+        # Waiters get the failure; cancellation or an abandoned stream keeps the default error
+        error = e
+        raise
+    finally:
+        text = ''.join(parts).strip()
+        if error is None:
+            _store(lookup, text)
+        if future is not None:
+            flight.finish(lookup.key, future, text, error)
+
+async def cached_ainvoke(prompt: Any, llm: Any, inputs: Dict[str, Any],
+                         cache: Optional[ResponseCache] = None,
+                         semantic: Optional[SemanticCache] = None,
+                         flight: Optional[SingleFlight] = None,
+                         session: Optional[str] = None,
+                         mode: Optional[str] = None) -> str:
+    """Async cached_invoke: the chain call runs with ainvoke, blocking cache work in a worker thread."""
+    lookup = await _alookup(prompt, llm, inputs, cache, semantic, mode)
+    if lookup.text is not None:
+        return lookup.text
+
+    async def generate() -> str:
+        await _aacquire(lookup, session)
+        response = await get_chain(prompt, llm).ainvoke(inputs)
+        text = getattr(response, 'content', response).strip()
+        await _astore(lookup, text)
+        return text
+
+    if flight is None:
+        flight = get_single_flight()
+    return await flight.ado(lookup.key, generate) if flight is not None else await generate()
+
+async def cached_astream(prompt: Any, llm: Any, inputs: Dict[str, Any],
+                         cache: Optional[ResponseCache] = None,
+                         semantic: Optional[SemanticCache] = None,
+                         flight: Optional[SingleFlight] = None,
+                         session: Optional[str] = None,
+                         mode: Optional[str] = None) -> AsyncIterator[str]:
+    """Async cached_stream: yields text chunks from astream, caching the completed response."""
+    lookup = await _alookup(prompt, llm, inputs, cache, semantic, mode)
+    if lookup.text is not None:
+        yield lookup.text
+        return
+
+    if flight is None:
+        flight = get_single_flight()
+    leader, future = flight.begin(lookup.key) if flight is not None else (True, None)
+    if not leader:
+        yield await wait_for_leader(future)
+        return
+
+    parts: List[str] = []
+    error: Optional[BaseException] = RuntimeError("Stream abandoned before completion")
+    try:
+        await _aacquire(lookup, session)
+        async for chunk in get_chain(prompt, llm).astream(inputs):
+            text = getattr(chunk, 'content', chunk)
+            if not parts:
+                text = text.lstrip()
+            if text:
+                parts.append(text)
+                yield text
+        error = None
+    except Exception as e:
+        # Waiters get the failure; cancellation or an abandoned stream keeps the default error
+        error = e
+        raise
+    finally:
+        text = ''.join(parts).strip()
+        try:
+            if error is None:
+                # Only reached on normal completion, where awaiting is allowed
+                await _astore(lookup, text)
+        finally:
+            if future is not None:
+                flight.finish(lookup.key, future, text, error)
@@ -0,0 +1,145 @@
+"""Pluggable verse retrieval backends for VerseManager."""
+import re
+import zlib
+import logging
+from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
+from lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+class RetrievalBackend:
+    """Base class for backends that rank verses against free-text queries."""
+
+    name = "base"
+
+    def build(self, verses: List[Dict[str, Any]]):
+        """Index the corpus; called by VerseManager after every load."""
+        raise NotImplementedError
+
+    def search(self, query: str, top_k: int = 5,
+               candidates: Optional[List[int]] = None) -> List[Tuple[int, float]]:
+        """Return up to top_k (verse id, score) pairs, best first."""
+        raise NotImplementedError
+
+class HashedEmbeddingBackend(RetrievalBackend):
+    """
+    Offline semantic-ish retrieval using hashed word and character n-gram vectors.
+
+    Every word contributes its own feature plus its boundary-marked character
+    n-grams ("heavy" -> "<he", "hea", ..., "vy>"), hashed into a fixed number of
+    signed buckets. Related word forms ("heavy", "heaviness") therefore share
+    features without any model download, network access or GPU. Verse vectors
+    are L2-normalized and stored as one contiguous float32 matrix, so a query is
+    a single matrix-vector product (cosine similarity).
+    """
+
+    name = "embedding"
+    BUILD_CHUNK = 2048
+    # Memoized word vectors (~1 KB each at dim=256); bounded because every
+    # query and every semantic-cache message brings new words
+    WORD_CACHE_SIZE = 8192
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        # Word -> hashed feature vector; words repeat a lot, so most are hashed once
+        self._word_vectors = LRUCache(self.WORD_CACHE_SIZE)
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        """Get the (unnormalized) hashed vector of a word and its character n-grams."""
+        vector = self._word_vectors.get(word)
+        if vector is not None:
+            return vector
+
+        grams = [word]
+        marked = f"<{word}>"
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            grams.extend(marked[i:i + n] for i in range(len(marked) - n + 1))
+
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        hashes = np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams),
+                             dtype=np.uint32, count=len(grams))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        self._word_vectors.put(word, vector)
+        return vector
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix of L2-normalized rows."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        word_ids: Dict[str, int] = {}
+        tokens: List[int] = []
+        starts: List[int] = []
+        rows: List[int] = []
+        for row, text in enumerate(texts):
+            words = _WORD_RE.findall(text.lower())
+            if words:
+                rows.append(row)
+                starts.append(len(tokens))
+                tokens.extend(word_ids.setdefault(word, len(word_ids)) for word in words)
+
+        if tokens:
+            # Sum each text's word vectors with one gather + segmented reduction
+            vocabulary = np.stack([self._word_vector(word) for word in word_ids])
+            matrix[rows] = np.add.reduceat(vocabulary[tokens], starts, axis=0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def build(self, verses: List[Dict[str, Any]]):
+        """Embed every verse (text and tags) into a contiguous matrix."""
+        documents = [f"{verse.get('text', '')} {' '.join(verse.get('tags', []))}" for verse in verses]
+        matrix = np.zeros((len(documents), self.dim), dtype=np.float32)
+        # Embed in chunks to bound the temporary gather buffer
+        for start in range(0, len(documents), self.BUILD_CHUNK):
+            matrix[start:start + self.BUILD_CHUNK] = self.embed(documents[start:start + self.BUILD_CHUNK])
+        self._matrix = matrix
+        logger.info(f"Embedded {len(verses)} verses into {self.dim}-dim hashed vectors")
+
+    def search(self, query: str, top_k: int = 5,
+               candidates: Optional[List[int]] = None) -> List[Tuple[int, float]]:
+        """Rank verses by cosine similarity to the query."""
+        if top_k <= 0 or not len(self._matrix):
+            return []
+        query_vector = self.embed([query])[0]
+        if not query_vector.any():
+            return []
+
+        if candidates is None:
+            ids = None
+            similarities = self._matrix @ query_vector
+        else:
+            ids = np.asarray(candidates, dtype=np.int64)
+            similarities = self._matrix[ids] @ query_vector
+
+        k = min(top_k, len(similarities))
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best], kind='stable')]
+        return [
+            (int(best_id if ids is None else ids[best_id]), float(similarities[best_id]))
+            for best_id in best if similarities[best_id] > 0
+        ]
+
+BACKENDS = {
+    HashedEmbeddingBackend.name: HashedEmbeddingBackend,
+}
+
+def get_backend(name: Optional[str]) -> Optional[RetrievalBackend]:
+    """
+    Create a retrieval backend by name.
+
+    'keyword' (or None) means VerseManager's built-in index and returns None.
+    Unknown names log a warning and also fall back to the keyword index.
+    """
+    if not name or name == 'keyword':
+        return None
+    backend_class = BACKENDS.get(name.lower())
+    if backend_class is None:
+        logger.warning(f"Unknown retrieval backend '{name}', using keyword matching")
+        return None
+    return backend_class()
@@ -0,0 +1,176 @@
+"""
+Near-duplicate response cache.
+
+The exact response cache misses messages that say the same thing in other
+words ("I'm so anxious" / "i am really anxious today"). This tier normalizes
+a message into:
+
+- its lexicon keyword set plus a negation flag, which must match exactly
+- a hashed embedding of its content words (stop words dropped), compared by
+  cosine similarity against earlier messages with the same keyword set
+
+and serves the earlier response when the similarity reaches a threshold.
+Embeddings use the offline HashedEmbeddingBackend, so no model or network is
+needed. Messages without any lexicon keyword are never matched.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
+from retrieval import HashedEmbeddingBackend
+from utils import extract_keywords_from_input
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Function words that carry no meaning for matching; negations are kept
+STOP_WORDS = frozenset(
+    "a about am an and are as at be been being but by d did do does feel feeling felt for from get got "
+    "had has have he her i im in is it its just ll m me my myself now of on or our really re s she so "
+    "that the them these they this those to today tonight too very ve was we were with you your".split()
+)
+NEGATIONS = frozenset("no not never nor nothing nobody cannot cant dont doesnt didnt isnt wont t".split())
+
+BucketKey = Tuple[str, Tuple[str, ...], bool]
+
+class SemanticCache:
+    """
+    Similarity-matched responses, bucketed by scope and keyword set.
+
+    Args:
+        threshold: Minimum cosine similarity of content-word embeddings for a hit
+        maxsize: Maximum number of buckets kept (least recently used dropped)
+        bucket_size: Maximum responses remembered per bucket (oldest dropped)
+        dim: Embedding dimension
+    """
+
+    def __init__(self, threshold: float = 0.9, maxsize: int = 1024, bucket_size: int = 8, dim: int = 256):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.bucket_size = bucket_size
+        self.embedder = HashedEmbeddingBackend(dim=dim)
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self._buckets: 'OrderedDict[BucketKey, List[Tuple[np.ndarray, str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def normalize(self, message: str) -> Tuple[Tuple[str, ...], bool, str]:
+        """
+        Normalize a message for matching.
+
+        Returns:
+            (sorted keyword tags, whether it contains a negation, content words)
+        """
+        words = _WORD_RE.findall(message.lower())
+        keywords = tuple(sorted(set(extract_keywords_from_input(message))))
+        negated = any(word in NEGATIONS for word in words)
+        content = ' '.join(word for word in words if word not in STOP_WORDS)
+        return keywords, negated, content
+
+    def _prepare(self, scope: str, message: str) -> Optional[Tuple[BucketKey, np.ndarray]]:
+        keywords, negated, content = self.normalize(message)
+        if not keywords or not content:
+            return None
+        vector = self.embedder.embed([content])[0]
+        return (scope, keywords, negated), vector
+
+    def lookup(self, scope: str, message: str) -> Optional[str]:
+        """
+        Find the response to the most similar earlier message.
+
+        Args:
+            scope: Prompt/model identity; only entries from the same scope match
+            message: User message
+
+        Returns:
+            Cached response, or None below the threshold
+        """
+        prepared = self._prepare(scope, message)
+        if prepared is None:
+            with self._lock:
+                self.skipped += 1
+            return None
+        bucket_key, vector = prepared
+        with self._lock:
+            entries = self._buckets.get(bucket_key)
+            if entries:
+                similarities = np.stack([entry[0] for entry in entries]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._buckets.move_to_end(bucket_key)
+                    self.hits += 1
+                    return entries[best][1]
+            self.misses += 1
+            return None
+
+    def add(self, scope: str, message: str, response: str):
+        """Remember the response generated for a message."""
+        prepared = self._prepare(scope, message)
+        if prepared is None or self.maxsize <= 0:
+            return
+        bucket_key, vector = prepared
+        with self._lock:
+            entries = self._buckets.setdefault(bucket_key, [])
+            entries.append((vector, response))
+            del entries[:-self.bucket_size]
+            self._buckets.move_to_end(bucket_key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            self.stores += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._buckets.clear()
+            self.hits = self.misses = self.skipped = self.stores = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hits (LLM calls saved), misses, skipped messages, stores and size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'skipped': self.skipped,
+                    'stores': self.stores, 'calls_saved': self.hits,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'buckets': len(self._buckets), 'maxsize': self.maxsize}
+
+def build_semantic_cache(settings: Optional[Dict[str, Any]] = None) -> Optional[SemanticCache]:
+    """
+    Build a semantic cache from configuration.
+
+    Args:
+        settings: Config-like mapping (defaults to the global config)
+
+    Returns:
+        SemanticCache, or None if SEMANTIC_CACHE is off
+    """
+    if settings is None:
+        from config import config
+        settings = config
+    if not settings.get('semantic_cache', True):
+        return None
+    return SemanticCache(threshold=settings.get('semantic_cache_threshold', 0.9),
+                         maxsize=settings.get('semantic_cache_size', 1024))
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_built = False
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the process-wide semantic cache, building it on first use."""
+    global _semantic_cache, _semantic_cache_built
+    if _semantic_cache_built:
+        return _semantic_cache
+    with _semantic_cache_lock:
+        if not _semantic_cache_built:
+            _semantic_cache = build_semantic_cache()
+            _semantic_cache_built = True
+        return _semantic_cache
+
+def invalidate_semantic_cache():
+    """Drop the shared semantic cache so the next use rebuilds it from configuration."""
+    global _semantic_cache, _semantic_cache_built
+    with _semantic_cache_lock:
+        _semantic_cache = None
+        _semantic_cache_built = False
@@ -0,0 +1,118 @@
+"""
+Single-flight coalescing of identical in-flight LLM calls.
+
+When several conversations send the same rendered prompt at once (a common
+message arriving from many Streamlit users in the same second), only the
+first caller (the leader) calls the model; everyone else waits for and
+shares its result or error. Calls are tracked with concurrent.futures.Future,
+so threads (Streamlit sessions, the sync API) and asyncio tasks (the
+pipeline) coalesce with each other.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Awaitable, Hashable, Tuple, Optional
+
+def _waiter_error(error: BaseException) -> Exception:
+    """Error handed to waiters; a cancelled or interrupted leader must not cancel them too."""
+    if isinstance(error, Exception):
+        return error
+    return RuntimeError(f"Coalesced call was interrupted: {error!r}")
+
+async def wait_for_leader(future: Future) -> Any:
+    """Await a leader's future; cancelling the waiter does not cancel the shared call."""
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request identity."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: Hashable) -> Tuple[bool, Future]:
+        """
+        Join or start the call for a key.
+
+        Returns:
+            (True, future) if the caller must do the work and finish() it,
+            (False, future) if it should wait for the leader's future
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, future
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return True, future
+
+    def finish(self, key: Hashable, future: Future, result: Any = None,
+               error: Optional[BaseException] = None):
+        """Publish the leader's result (or error) to every waiter and end the call."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn once for all concurrent callers with the same key (blocking)."""
+        leader, future = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, future, error=_waiter_error(e))
+            raise
+        self.finish(key, future, result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once for all concurrent callers with the same key."""
+        leader, future = self.begin(key)
+        if not leader:
+            return await wait_for_leader(future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.finish(key, future, error=_waiter_error(e))
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Get upstream calls made, calls saved by coalescing and calls in flight."""
+        with self._lock:
+            return {'upstream_calls': self.leaders, 'calls_saved': self.coalesced,
+                    'in_flight': len(self._calls)}
+
+    def reset_stats(self):
+        """Reset the counters (in-flight calls are unaffected)."""
+        with self._lock:
+            self.leaders = 0
+            self.coalesced = 0
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_built = False
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """Get the process-wide coalescer, or None if REQUEST_COALESCING is off."""
+    global _single_flight, _single_flight_built
+    if _single_flight_built:
+        return _single_flight
+    with _single_flight_lock:
+        if not _single_flight_built:
+            from config import config
+            _single_flight = SingleFlight() if config.get('request_coalescing', True) else None
+            _single_flight_built = True
+        return _single_flight
@@ -0,0 +1,100 @@
+"""
+Lightweight tokenizer + stemmer shared by verse indexing and user input.
+
+The stemmer is a small subset of Porter's rules (plurals, -ed/-ing, -ness,
+-ful, final silent e) rather than a full linguistic stemmer: it only has to
+map the common inflections of one word to the same key on both sides of a
+lookup, e.g. "Tired." / "tiring" / "tire" -> "tire", "changed" / "change" ->
+"chang" and "worries" / "worry" -> "worri".
+Stems are memoized in a bounded LRU because vocabularies are small and
+repetitive.
+"""
+import re
+from functools import lru_cache
+from typing import List
+
+STEM_CACHE_SIZE = 65536
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_VOWELS = frozenset('aeiou')
+
+def _is_consonant(word: str, i: int) -> bool:
+    char = word[i]
+    if char in _VOWELS:
+        return False
+    # 'y' is a vowel after a consonant ("try"), a consonant otherwise ("yes")
+    if char == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+def _measure(stem: str) -> int:
+    """Porter's m: the number of vowel-consonant sequences in the stem."""
+    pattern = ''.join('c' if _is_consonant(stem, i) else 'v' for i in range(len(stem)))
+    return len(re.findall(r'v+c+', pattern))
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+def _ends_cvc(stem: str) -> bool:
+    """Consonant-vowel-consonant ending, last consonant not w/x/y ("hop", not "pray")."""
+    return (len(stem) >= 3 and _is_consonant(stem, -3) and not _is_consonant(stem, -2)
+            and _is_consonant(stem, -1) and stem[-1] not in 'wxy')
+
+def _strip_inflection(stem: str) -> str:
+    """Repair a stem after removing -ed/-ing ("hopp" -> "hop", "hop" -> "hope")."""
+    if stem.endswith(('at', 'bl', 'iz')):
+        return stem + 'e'
+    if len(stem) >= 2 and stem[-1] == stem[-2] and _is_consonant(stem, -1) and stem[-1] not in 'lsz':
+        return stem[:-1]
+    if _measure(stem) == 1 and _ends_cvc(stem):
+        return stem + 'e'
+    return stem
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word: str) -> str:
+    """Stem a lowercase token."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    # Plurals
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+
+    # Past tense and progressive
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    elif word.endswith('ed') and _has_vowel(word[:-2]):
+        word = _strip_inflection(word[:-2])
+    elif word.endswith('ing') and _has_vowel(word[:-3]):
+        word = _strip_inflection(word[:-3])
+
+    # Derivational suffixes that keep the root's meaning
+    if word.endswith('ness') and _measure(word[:-4]) > 0:
+        word = word[:-4]
+    elif word.endswith('ful') and _measure(word[:-3]) > 0:
+        word = word[:-3]
+
+    # Final y -> i so "worry" and "worries" meet
+    if word.endswith('y') and len(word) > 2 and _is_consonant(word, -2):
+        word = word[:-1] + 'i'
+
+    # Final silent e so "change" meets "changed" / "changing"; kept after a
+    # short consonant-vowel-consonant stem, where -ed/-ing restore it ("hope")
+    if word.endswith('e'):
+        measure = _measure(word[:-1])
+        if measure > 1 or (measure == 1 and not _ends_cvc(word[:-1])):
+            word = word[:-1]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+def analyze(text: str) -> List[str]:
+    """Tokenize and stem text; used for both indexing and queries."""
+    return list(map(stem, _TOKEN_RE.findall(text.lower())))
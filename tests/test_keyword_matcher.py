@@ -0,0 +1,18 @@
+"""Tests for the Aho-Corasick keyword matcher."""
+import pytest
+from keyword_matcher import Automaton, KeywordMatcher
+
+class TestKeywordMatcher:
+    """Test cases for KeywordMatcher."""
+
+    def test_finds_overlapping_keys(self):
+        """Test the classic overlapping-keys case, including keys found via failure links."""
+        automaton = Automaton(['he', 'she', 'his', 'hers'])
+        hits = sorted((start, automaton.patterns[pattern_id]) for start, pattern_id in automaton.finditer('ushers'))
+        assert hits == [(1, 'she'), (2, 'he'), (2, 'hers')]
+
+    def test_lookup_phrases_and_order(self):
+        """Test multi-word keys, case folding and first-match ordering without duplicates."""
+        matcher = KeywordMatcher({'panic attack': ['peace'], 'sad': ['comfort', 'sorrow'], 'sadness': ['comfort']})
+        assert matcher.lookup("Sadness and a PANIC ATTACK") == ['comfort', 'sorrow', 'peace']
+        assert matcher.lookup("") == []
@@ -0,0 +1,109 @@
+"""Tests for the shared keyword lexicon."""
+import pytest
+import os
+import json
+import re
+import pickle
+import tempfile
+from pathlib import Path
+from lexicon import Lexicon, DEFAULT_LEXICON, compile_lexicon, get_lexicon
+from utils import extract_keywords_from_input, get_mode_keywords
+
+class TestLexicon:
+    """Test cases for lexicon compilation and caching."""
+
+    def setup_method(self):
+        """Write a small lexicon file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'lexicon.json'
+        self.data = {
+            "version": 1,
+            "keywords": {"general": {"Sad": ["comfort"]}, "programmer": {"bug": ["patience"]}},
+            "modes": {"dating": ["love"]},
+        }
+        self.path.write_text(json.dumps(self.data))
+
+    def teardown_method(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+
+    def test_sections_and_modes(self):
+        """Test section matching, case folding and mode tags."""
+        lexicon = Lexicon.from_file(self.path)
+        assert lexicon.match("So SAD about this bug") == ['comfort']
+        assert lexicon.match("So SAD about this bug", sections=('general', 'programmer')) == ['comfort', 'patience']
+        assert lexicon.match("bug", sections=('missing',)) == []
+        assert lexicon.mode_tags('Dating') == ['love']
+        assert lexicon.mode_tags(None) == []
+
+    def test_compiled_cache_is_reused_until_source_changes(self):
+        """Test that the pickled lexicon is written, reused and refreshed."""
+        compile_lexicon(self.path)
+        cache_path = self.path.with_suffix('.pkl')
+        assert cache_path.exists()
+
+        # Reused while the source is unchanged
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        cached['lexicon'].modes['dating'] = ['from-cache']
+        with open(cache_path, 'wb') as f:
+            pickle.dump(cached, f)
+        assert compile_lexicon(self.path).mode_tags('dating') == ['from-cache']
+
+        # Rebuilt after the source changes
+        self.data['modes']['dating'] = ['romance']
+        self.path.write_text(json.dumps(self.data))
+        stat = self.path.stat()
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert compile_lexicon(self.path).mode_tags('dating') == ['romance']
+
+        # Rebuilt after the compiler code changes
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        cached['lexicon'].modes['dating'] = ['stale']
+        cached['version'] = 'older code'
+        with open(cache_path, 'wb') as f:
+            pickle.dump(cached, f)
+        assert compile_lexicon(self.path).mode_tags('dating') == ['romance']
+
+    def test_missing_lexicon_is_empty(self):
+        """Test that a missing lexicon file degrades to no matches."""
+        lexicon = get_lexicon(str(Path(self.temp_dir.name) / 'missing.json'))
+        assert lexicon.match("sad") == []
+
+    def test_front_end_helpers_use_shared_lexicon(self):
+        """Test the utils helpers against the bundled lexicon."""
+        assert get_lexicon() is get_lexicon()
+        assert 'assurance' not in extract_keywords_from_input("imposter syndrome")
+        assert 'assurance' in extract_keywords_from_input("imposter syndrome", context='programmer')
+        assert get_mode_keywords('spiritual') == ['faith', 'hope', 'trust', 'guidance']
+
+    def test_bundled_keys_match_their_inflections(self):
+        """Test that every single-word lexicon key matches its -s/-ed/-ing forms."""
+        def inflections(word):
+            if word.endswith('e'):
+                return [word + 's', word + 'd', word[:-1] + 'ing']
+            if re.search(r'[^aeiou]y$', word):
+                return [word[:-1] + 'ies', word[:-1] + 'ied', word + 'ing']
+            if re.fullmatch(r'[^aeiou]*[aeiou][^aeiouwxy]', word):
+                return [word + 's', word + word[-1] + 'ed', word + word[-1] + 'ing']
+            return [word + 's', word + 'ed', word + 'ing']
+
+        data = json.loads(DEFAULT_LEXICON.read_text(encoding='utf-8'))
+        lexicon = Lexicon(data['keywords'], data['modes'])
+        checked = 0
+        for section, words in data['keywords'].items():
+            for word, tags in words.items():
+                # Keys that are already inflected ("worried", "meeting") have no regular base here
+                if not word.isalpha() or word.endswith(('s', 'ed', 'ing')):
+                    continue
+                for form in inflections(word):
+                    matched = lexicon.match(f"my {form} today", sections=(section,))
+                    assert set(tags) <= set(matched), (section, word, form, matched)
+                    checked += 1
+        assert checked > 100
+
+    def test_silent_e_keys_match_past_tense(self):
+        """Test that "changed" finds the "change" key like the legacy matcher did."""
+        assert extract_keywords_from_input("my life changed") == ['courage', 'trust']
+        assert extract_keywords_from_input("my life changed", legacy_partial=True) == ['courage', 'trust']
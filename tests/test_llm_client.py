@@ -0,0 +1,62 @@
+"""Tests for the shared LLM client factory."""
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from prompts import BIBLE_MOTIVATE_PROMPT, PROGRAMMER_MOTIVATE_PROMPT
+from llm_client import (
+    OPENROUTER_BASE_URL, create_llm, get_chain, get_http_client, get_async_http_client, close_clients
+)
+from pipeline import get_background_loop
+
+class TestLLMClient:
+    """Test cases for create_llm and get_chain."""
+
+    def setup_method(self):
+        """Use explicit settings instead of the environment."""
+        close_clients()
+        self.settings = {
+            'openai_model': 'gpt-4o-mini', 'openai_temperature': 0.3, 'openai_max_tokens': 120,
+            'openai_timeout': 12.0, 'openai_pool_size': 4, 'openai_max_retries': 1,
+        }
+
+    def teardown_method(self):
+        """Release the shared clients."""
+        close_clients()
+
+    def test_models_follow_config_and_share_pool(self):
+        """Test that models use configured settings, one HTTP pool and one instance per settings."""
+        llm = create_llm('sk-test', settings=self.settings)
+        assert (llm.model_name, llm.temperature, llm.max_tokens, llm.max_retries) == ('gpt-4o-mini', 0.3, 120, 1)
+        assert llm.http_client is get_http_client()
+        assert get_http_client().timeout.read == 12.0
+        assert create_llm('sk-test', settings=self.settings) is llm
+
+        other = create_llm('sk-test', settings=self.settings, temperature=0.9)
+        assert other is not llm
+        assert other.temperature == 0.9
+        assert other.http_client is llm.http_client
+
+    def test_openrouter_keys(self):
+        """Test that OpenRouter keys get the OpenRouter endpoint and namespaced model."""
+        llm = create_llm('sk-or-v1-test', settings=self.settings)
+        assert llm.openai_api_base == OPENROUTER_BASE_URL
+        assert llm.model_name == 'openai/gpt-4o-mini'
+
+    def test_chains_are_composed_once(self):
+        """Test that get_chain reuses the chain for the same prompt and model."""
+        llm = FakeListChatModel(responses=['ok'])
+        chain = get_chain(BIBLE_MOTIVATE_PROMPT, llm)
+        assert get_chain(BIBLE_MOTIVATE_PROMPT, llm) is chain
+        assert get_chain(PROGRAMMER_MOTIVATE_PROMPT, llm) is not chain
+        assert chain.invoke({'user_input': 'hi', 'verse_ref': 'r', 'verse_text': 't'}).content == 'ok'
+
+    def test_close_clients_closes_both_pools(self):
+        """Test that closing releases the async pool too, with and without the background loop."""
+        sync_client, async_client = get_http_client(self.settings), get_async_http_client(self.settings)
+        close_clients()
+        assert sync_client.is_closed and async_client.is_closed
+
+        get_background_loop()
+        async_client = get_async_http_client(self.settings)
+        close_clients()
+        assert async_client.is_closed
+        assert get_async_http_client(self.settings) is not async_client
@@ -0,0 +1,50 @@
+"""Tests for the LRU cache."""
+import pytest
+from lru import LRUCache
+
+class TestLRUCache:
+    """Test cases for LRUCache."""
+
+    def test_eviction_order_and_counters(self):
+        """Test least-recently-used eviction and hit/miss accounting."""
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2}
+
+    def test_get_or_compute_caches_none(self):
+        """Test that computed values, including None, are stored once."""
+        cache = LRUCache(maxsize=4)
+        calls = []
+        compute = lambda: calls.append(1)
+        assert cache.get_or_compute('key', compute) is None
+        assert cache.get_or_compute('key', compute) is None
+        assert len(calls) == 1
+
+    def test_zero_size_disables_caching(self):
+        """Test that maxsize 0 never stores values."""
+        cache = LRUCache(maxsize=0)
+        cache.put('a', 1)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+        cache.clear()
+        assert cache.stats()['misses'] == 0
+
+    def test_weight_bound_evicts_large_entries(self):
+        """Test that weighed entries are evicted by total weight, and oversized ones are not stored."""
+        cache = LRUCache(maxsize=10, weigh=len, maxweight=5)
+        cache.put('a', [1, 2])
+        cache.put('b', [1, 2, 3])
+        cache.put('c', [1, 2])
+        assert cache.get('a') is None
+        assert cache.stats()['weight'] == 5
+        cache.put('huge', list(range(6)))
+        assert cache.get('huge') is None
+        assert len(cache) == 2
+        cache.clear()
+        assert cache.stats()['weight'] == 0
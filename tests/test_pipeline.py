@@ -0,0 +1,88 @@
+"""Tests for the async response pipeline."""
+import pytest
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from pipeline import ResponsePipeline, get_background_loop
+from response_cache import ResponseCache, MemoryTier
+from semantic_cache import SemanticCache
+from utils import VerseManager
+
+class RecordingChatModel(FakeListChatModel):
+    """Fake model that echoes the prompt and records how many calls overlap."""
+
+    active: int = 0
+    peak: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        type(self).active += 1
+        type(self).peak = max(type(self).peak, type(self).active)
+        try:
+            await asyncio.sleep(0.01)
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            type(self).active -= 1
+
+class TestResponsePipeline:
+    """Test cases for ResponsePipeline and the background loop."""
+
+    def setup_method(self):
+        """Set up a verse file and fresh caches."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = Path(self.temp_dir.name) / 'verses.json'
+        path.write_text(json.dumps([
+            {"ref": "Test 1:1", "text": "Be strong and of a good courage.", "tags": ["strength", "courage"]},
+            {"ref": "Test 2:2", "text": "Peace I leave with you.", "tags": ["peace", "anxiety"]},
+        ]))
+        self.manager = VerseManager(str(path))
+
+    def teardown_method(self):
+        """Remove the verse file."""
+        self.temp_dir.cleanup()
+
+    def _pipeline(self, llm):
+        return ResponsePipeline(llm, self.manager, cache=ResponseCache([MemoryTier()]), semantic=SemanticCache())
+
+    def test_prepare_uses_context_and_verse(self):
+        """Test that the prompt follows the context and the verse follows the keywords."""
+        prompt, _ = self._pipeline(None).prepare('I feel anxious', context='programmer')
+        assert 'programmer' in prompt.template
+        # Programmer mode adds 'strength' to the keywords, so check the verse in general mode
+        _, inputs = self._pipeline(None).prepare('I feel anxious')
+        assert inputs == {'user_input': 'I feel anxious', 'verse_ref': 'Test 2:2',
+                          'verse_text': 'Peace I leave with you.'}
+
+    def test_same_message_gets_same_prompt(self):
+        """Test that identical messages render identical prompts, so they can coalesce."""
+        pipeline = self._pipeline(None)
+        picks = {pipeline.prepare('I need strength and peace', context=context)[1]['verse_ref']
+                 for context in ('general', 'programmer') for _ in range(50)}
+        assert len(picks) <= 2
+        assert len({pipeline.prepare('I need strength and peace')[1]['verse_ref'] for _ in range(50)}) == 1
+
+    def test_respond_and_stream(self):
+        """Test full and streamed responses, the second served from the cache."""
+        pipeline = self._pipeline(FakeListChatModel(responses=['be at peace']))
+        assert asyncio.run(pipeline.respond('I feel anxious')) == 'be at peace'
+
+        async def collect():
+            return [chunk async for chunk in pipeline.stream('I feel anxious')]
+        assert asyncio.run(collect()) == ['be at peace']
+
+    def test_many_conversations_run_concurrently(self):
+        """Test that concurrent messages overlap their model calls and keep input order."""
+        RecordingChatModel.active = RecordingChatModel.peak = 0
+        messages = [f'message number {i}' for i in range(20)]
+        pipeline = self._pipeline(RecordingChatModel(responses=['ok']))
+        results = asyncio.run(pipeline.respond_many(messages))
+        assert results == ['ok'] * 20
+        assert RecordingChatModel.peak > 1
+
+    def test_background_loop(self):
+        """Test that coroutines submitted from a thread run on the shared loop."""
+        loop = get_background_loop()
+        assert get_background_loop() is loop
+        pipeline = self._pipeline(FakeListChatModel(responses=['from the loop']))
+        assert loop.submit(pipeline.respond('I need strength')).result(timeout=5) == 'from the loop'
@@ -0,0 +1,60 @@
+"""Tests for the python_motivator batch mode."""
+import pytest
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+from python_motivator import read_issues, run_batch
+
+class SlowMotivator:
+    """Stand-in for ProgrammerMotivator whose later issues finish first."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def get_motivation_async(self, issue: str) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.02 if issue.endswith('0') else 0.001)
+            return f"keep going: {issue}"
+        finally:
+            self.active -= 1
+
+class TestBatchMode:
+    """Test cases for read_issues and run_batch."""
+
+    def setup_method(self):
+        """Set up a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+
+    def teardown_method(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+
+    def test_read_plain_and_json_lines(self, capsys):
+        """Test plain lines, JSON strings and objects, skipping blanks and warning on empty records."""
+        path = self.dir / 'standup.txt'
+        path.write_text('stuck on a bug\n\n{"issue": "flaky tests"}\n"merge conflicts"\n'
+                        '{"text": "imposter syndrome"}\n{not json}\n{"other": 1}\n', encoding='utf-8')
+        assert list(read_issues(str(path))) == [
+            'stuck on a bug', 'flaky tests', 'merge conflicts', 'imposter syndrome', '{not json}'
+        ]
+        assert 'Skipping line 7' in capsys.readouterr().err
+
+    def test_results_in_input_order_with_bounded_concurrency(self):
+        """Test that output keeps input order while at most `concurrency` calls run."""
+        motivator = SlowMotivator()
+        issues = [f'issue {i}' for i in range(25)]
+        records = []
+        summary = asyncio.run(run_batch(motivator, iter(issues), records.append, concurrency=3))
+
+        assert [record['index'] for record in records] == list(range(25))
+        assert [record['issue'] for record in records] == issues
+        assert records[4]['response'] == 'keep going: issue 4'
+        assert all(record['latency_ms'] >= 0 for record in records)
+        assert 1 < motivator.peak <= 3
+        assert summary['count'] == 25
+        json.dumps(records)
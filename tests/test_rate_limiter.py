@@ -0,0 +1,131 @@
+"""Tests for the client-side rate limiter."""
+import pytest
+import json
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from pipeline import ResponsePipeline
+from rate_limiter import TokenBucket, RateLimiter, RateLimitExceeded, build_rate_limiter
+from response_cache import ResponseCache, MemoryTier
+from semantic_cache import SemanticCache
+from utils import VerseManager
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestRateLimiter:
+    """Test cases for TokenBucket and RateLimiter."""
+
+    def setup_method(self):
+        """Set up a fake clock."""
+        self.clock = FakeClock()
+
+    def _exhausted_limiter(self, deadline=100.0):
+        # 1 request per second, bursts of 10; the burst is already spent
+        limiter = RateLimiter(rpm=60, tpm=1000000, max_tokens=10, deadline=deadline, clock=self.clock)
+        limiter.requests.consume(limiter.requests.capacity)
+        return limiter
+
+    def test_bucket_refills_over_time(self):
+        """Test that a drained bucket reports its wait and refills at its rate."""
+        bucket = TokenBucket(60, capacity=5, clock=self.clock)
+        assert bucket.wait_time(5) == 0
+        bucket.consume(5)
+        assert bucket.wait_time(2) == pytest.approx(2.0)
+        self.clock.now = 2.0
+        assert bucket.wait_time(2) == 0
+        self.clock.now = 100.0
+        assert bucket.wait_time(6) == pytest.approx(1.0)
+
+    def test_estimate_uses_prompt_and_completion_budget(self):
+        """Test that the token estimate counts the prompt and max_tokens."""
+        limiter = RateLimiter(rpm=60, tpm=6000, max_tokens=300, clock=self.clock)
+        assert limiter.estimate_tokens('x' * 400) == 400
+
+    def test_sheds_when_wait_exceeds_deadline(self):
+        """Test that calls are shed once the queue would outlast the deadline."""
+        limiter = self._exhausted_limiter(deadline=2.0)
+        limiter._enqueue('a', 'hello')
+        limiter._enqueue('a', 'hello')
+        with pytest.raises(RateLimitExceeded):
+            limiter._enqueue('b', 'hello')
+        assert limiter.stats()['shed'] == 1
+        assert limiter.stats()['queued'] == 2
+
+    def test_token_budget_limits_calls(self):
+        """Test that large prompts wait on the tokens-per-minute bucket."""
+        limiter = RateLimiter(rpm=6000, tpm=600, max_tokens=0, deadline=5.0, clock=self.clock)
+        # 10 tokens/s with a burst of 100
+        limiter._enqueue('a', 'x' * 400)
+        with pytest.raises(RateLimitExceeded):
+            limiter._enqueue('a', 'x' * 400)
+
+    def test_sessions_are_served_round_robin(self):
+        """Test that a new session is not stuck behind a busy one."""
+        limiter = self._exhausted_limiter()
+        granted = []
+        requests = [limiter._enqueue(session, 'hello') for session in ('busy', 'busy', 'busy', 'new')]
+        for request in requests:
+            request.future.add_done_callback(lambda _, session=request.session: granted.append(session))
+        for _ in range(4):
+            self.clock.now += 1.0
+            with limiter._condition:
+                limiter._dispatch()
+        assert granted == ['busy', 'new', 'busy', 'busy']
+        assert limiter.stats()['granted'] == 4
+        assert limiter.stats()['queued'] == 0
+
+    def test_acquire_with_budget(self):
+        """Test that blocking and async acquire return at once while budget remains."""
+        limiter = RateLimiter(rpm=600, tpm=100000)
+        assert limiter.acquire('hello', session='a') < 1.0
+        assert asyncio.run(limiter.aacquire('hello', session='b')) < 1.0
+        assert limiter.stats()['granted'] == 2
+
+    def test_build_respects_config(self):
+        """Test that RATE_LIMIT=false disables the limiter."""
+        assert build_rate_limiter({'rate_limit': False}) is None
+        limiter = build_rate_limiter({'openai_rpm': 120, 'openai_max_tokens': 50, 'rate_limit_deadline': 3})
+        assert limiter.requests.rate == 2.0
+        assert limiter.max_tokens == 50
+        assert limiter.deadline == 3
+
+class TestRateLimitedPipeline:
+    """Test cases for shedding to the offline responder."""
+
+    def setup_method(self):
+        """Set up a verse file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = Path(self.temp_dir.name) / 'verses.json'
+        path.write_text(json.dumps([
+            {"ref": "Test 1:1", "text": "Peace I leave with you.", "tags": ["peace", "anxiety"]},
+        ]))
+        self.manager = VerseManager(str(path))
+
+    def teardown_method(self):
+        """Remove the verse file."""
+        self.temp_dir.cleanup()
+
+    def test_shed_call_gets_offline_reply(self):
+        """Test that a shed call is answered offline without calling the model."""
+        limiter = RateLimiter(rpm=60, tpm=100000, deadline=0.0)
+        limiter.requests.consume(limiter.requests.capacity)
+        pipeline = ResponsePipeline(FakeListChatModel(responses=['from the model']), self.manager,
+                                    cache=ResponseCache([MemoryTier()]), semantic=SemanticCache())
+        with patch('response_cache.get_rate_limiter', return_value=limiter):
+            response = asyncio.run(pipeline.respond('I feel anxious', session='a'))
+
+            async def collect():
+                return [chunk async for chunk in pipeline.stream('I feel anxious', session='a')]
+            chunks = asyncio.run(collect())
+        assert response and response != 'from the model'
+        assert len(chunks) == 1 and chunks[0] != 'from the model'
+        assert limiter.stats()['shed'] == 2
@@ -0,0 +1,184 @@
+"""Tests for the LLM response cache."""
+import pytest
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from prompts import BIBLE_MOTIVATE_PROMPT, PROGRAMMER_MOTIVATE_PROMPT
+from semantic_cache import SemanticCache
+from response_cache import (
+    MemoryTier, SQLiteTier, ResponseCache, build_response_cache, cache_key, cached_invoke, cached_stream,
+    cached_ainvoke
+)
+
+class SlowTier(MemoryTier):
+    """Memory tier that blocks like a locked database."""
+
+    blocking = True
+
+    def get(self, key):
+        time.sleep(0.2)
+        return super().get(key)
+
+class TestResponseCache:
+    """Test cases for the memory and SQLite tiers and cached_invoke."""
+
+    def setup_method(self):
+        """Set up a temporary database path and prompt inputs."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / 'responses.sqlite3')
+        self.inputs = {'user_input': 'I feel anxious', 'verse_ref': 'Test 1:1', 'verse_text': 'Fear not.'}
+
+    def teardown_method(self):
+        """Remove the temporary database."""
+        self.temp_dir.cleanup()
+
+    def test_memory_tier_lru_and_ttl(self):
+        """Test LRU eviction and TTL expiry counters of the memory tier."""
+        tier = MemoryTier(maxsize=2, ttl=60)
+        tier.put('a', 'A')
+        tier.put('b', 'B')
+        assert tier.get('a') == 'A'
+        tier.put('c', 'C')
+        assert tier.get('b') is None
+        with patch('response_cache.time.monotonic', return_value=10 ** 9):
+            assert tier.get('a') is None
+        stats = tier.stats()
+        assert stats['evictions'] == 1
+        assert stats['expirations'] == 1
+        assert stats['size'] == 1
+
+    def test_sqlite_tier_persists_and_evicts(self):
+        """Test that entries survive reopening and the least recently read are evicted."""
+        tier = SQLiteTier(self.db_path, ttl=60, max_entries=2)
+        tier.put('a', 'A')
+        tier.put('b', 'B')
+        with patch('response_cache.time.time', return_value=tier._conn.execute(
+                'SELECT MAX(accessed) FROM responses').fetchone()[0] + 1):
+            assert tier.get('a') == 'A'
+            tier.put('c', 'C')
+        assert tier.stats()['evictions'] == 1
+        tier.close()
+
+        reopened = SQLiteTier(self.db_path, ttl=60, max_entries=2)
+        assert reopened.get('b') is None
+        assert reopened.get('a') == 'A'
+        with patch('response_cache.time.time', return_value=10 ** 12):
+            assert reopened.get('c') is None
+        assert reopened.stats()['expirations'] == 1
+        reopened.close()
+
+    def test_tiers_backfill_and_size_limit(self):
+        """Test that disk hits refill memory and oversized responses are skipped."""
+        memory = MemoryTier(maxsize=8)
+        disk = SQLiteTier(self.db_path)
+        cache = ResponseCache([memory, disk], max_entry_bytes=10)
+        disk.put('key', 'from disk')
+        assert cache.get('key') == 'from disk'
+        assert memory.get('key') == 'from disk'
+
+        assert cache.put('big', 'x' * 11) is False
+        assert cache.get('big') is None
+        stats = cache.stats()
+        assert stats['rejected'] == 1
+        assert stats['hits'] == 1
+        assert stats['SQLiteTier']['size'] == 1
+        disk.close()
+
+    def test_cached_invoke_skips_repeat_calls(self):
+        """Test that identical prompts and settings reuse the first response."""
+        cache = ResponseCache([MemoryTier()])
+        semantic = SemanticCache()
+        llm = FakeListChatModel(responses=[' first ', 'second', 'third'])
+
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=cache, semantic=semantic) == 'first'
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, dict(self.inputs), cache=cache, semantic=semantic) == 'first'
+        # A different prompt template is a different entry in both caches
+        assert cached_invoke(PROGRAMMER_MOTIVATE_PROMPT, llm, self.inputs, cache=cache, semantic=semantic) == 'second'
+        assert cache.stats()['hits'] == 1
+        assert semantic.stats()['hits'] == 0
+
+    def test_cached_invoke_serves_near_duplicates(self):
+        """Test that a reworded message reuses the response without an LLM call."""
+        cache = ResponseCache([MemoryTier()])
+        semantic = SemanticCache(threshold=0.8)
+        llm = FakeListChatModel(responses=['calm answer', 'fresh answer'])
+        reworded = dict(self.inputs, user_input='i am really anxious today')
+
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, dict(self.inputs, user_input="I'm so anxious"),
+                             cache=cache, semantic=semantic) == 'calm answer'
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, reworded, cache=cache, semantic=semantic) == 'calm answer'
+        assert semantic.stats()['calls_saved'] == 1
+        # The near-duplicate is now an exact hit as well
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, reworded, cache=cache, semantic=semantic) == 'calm answer'
+        assert cache.stats()['hits'] == 1
+        # Modes sharing the prompt template do not share near-duplicates
+        dating = dict(self.inputs, user_input='really anxious')
+        assert cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, dating, cache=cache, semantic=semantic,
+                             mode='dating') == 'fresh answer'
+
+    def test_cached_stream(self):
+        """Test that streams are cached once complete and failed streams are not."""
+        cache = ResponseCache([MemoryTier()])
+        semantic = SemanticCache()
+        llm = FakeListChatModel(responses=['  streamed'])
+        chunks = list(cached_stream(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=cache, semantic=semantic))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == 'streamed'
+        assert list(cached_stream(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=cache, semantic=semantic)) == ['streamed']
+
+        failing = FakeListChatModel(responses=['partial answer'], error_on_chunk_number=3)
+        inputs = dict(self.inputs, user_input='my code will not compile')
+        with pytest.raises(Exception):
+            list(cached_stream(BIBLE_MOTIVATE_PROMPT, failing, inputs, cache=cache, semantic=semantic))
+        assert cache.stats()['stores'] == 1
+        assert semantic.stats()['stores'] == 1
+
+    def test_async_lookups_keep_the_loop_free(self):
+        """Test that blocking tiers run off the event loop while memory hits stay inline."""
+        memory, slow = MemoryTier(), SlowTier()
+        cache = ResponseCache([memory, slow])
+        llm = FakeListChatModel(responses=['answer'])
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            task = asyncio.create_task(ticker())
+            first = await cached_ainvoke(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=cache, semantic=SemanticCache())
+            task.cancel()
+            started = time.perf_counter()
+            second = await cached_ainvoke(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=cache)
+            return first, second, ticks, time.perf_counter() - started
+
+        first, second, ticks, hit_time = asyncio.run(run())
+        assert first == second == 'answer'
+        # The ticker kept running through the slow tier's lookup
+        assert ticks >= 5
+        # The repeat is a memory hit that never reaches the slow tier
+        assert hit_time < 0.1
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert memory.stats()['misses'] == 1
+
+    def test_key_includes_model_settings(self):
+        """Test that model, temperature and max_tokens change the key."""
+        base = {'model': 'gpt-3.5-turbo', 'temperature': 0.6, 'max_tokens': 300, 'base_url': None}
+        assert cache_key('prompt', base) == cache_key('prompt', dict(base))
+        for change in ({'model': 'gpt-4o'}, {'temperature': 0.7}, {'max_tokens': 100}):
+            assert cache_key('prompt', {**base, **change}) != cache_key('prompt', base)
+
+    def test_build_from_settings(self):
+        """Test building the configured tiers, or none when disabled."""
+        assert build_response_cache({'response_cache': False}) is None
+        cache = build_response_cache({'response_cache': True, 'response_cache_db': self.db_path})
+        assert [type(tier) for tier in cache.tiers] == [MemoryTier, SQLiteTier]
+        cache.tiers[1].close()
+        cache = build_response_cache({'response_cache': True, 'response_cache_db': ''})
+        assert [type(tier) for tier in cache.tiers] == [MemoryTier]
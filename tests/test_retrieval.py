@@ -0,0 +1,69 @@
+"""Tests for retrieval backends."""
+import pytest
+import json
+import tempfile
+import numpy as np
+from pathlib import Path
+from retrieval import HashedEmbeddingBackend, get_backend
+from utils import VerseManager
+
+class TestHashedEmbeddingBackend:
+    """Test cases for the hashed n-gram embedding backend."""
+    
+    def setup_method(self):
+        """Set up test data."""
+        self.test_verses = [
+            {"ref": "Test 1:1", "text": "Heaviness in the heart of man maketh it stoop.", "tags": ["sorrow"]},
+            {"ref": "Test 2:2", "text": "Be strong and of a good courage.", "tags": ["strength", "courage"]},
+            {"ref": "Test 3:3", "text": "Wisdom is the principal thing.", "tags": ["wisdom"]},
+        ]
+    
+    def test_embed_is_normalized_and_deterministic(self):
+        """Test that embeddings are unit-length float32 rows and stable across instances."""
+        first = HashedEmbeddingBackend(dim=64).embed(["my heart is heavy", ""])
+        second = HashedEmbeddingBackend(dim=64).embed(["my heart is heavy", ""])
+        assert first.dtype == np.float32
+        assert first.shape == (2, 64)
+        assert np.allclose(np.linalg.norm(first[0]), 1.0)
+        assert not first[1].any()
+        assert np.array_equal(first, second)
+    
+    def test_search_matches_related_word_forms(self):
+        """Test that paraphrased input reaches a verse via shared n-grams."""
+        backend = HashedEmbeddingBackend()
+        backend.build(self.test_verses)
+        results = backend.search("my heart is heavy", top_k=2)
+        assert results[0][0] == 0
+        assert results[0][1] > 0
+        assert backend.search("my heart is heavy", candidates=[1, 2]) != results
+        assert backend.search("") == []
+    
+    def test_word_cache_is_bounded(self, monkeypatch):
+        """Test that new words in queries do not grow the word vector cache without bound."""
+        monkeypatch.setattr(HashedEmbeddingBackend, 'WORD_CACHE_SIZE', 16)
+        backend = HashedEmbeddingBackend(dim=64)
+        first = backend.embed(["word0 word1"])
+        for i in range(100):
+            backend.embed([f"query{i} words{i}"])
+        assert len(backend._word_vectors) <= 16
+        assert np.array_equal(backend.embed(["word0 word1"]), first)
+    
+    def test_get_backend(self):
+        """Test backend lookup by name."""
+        assert get_backend(None) is None
+        assert get_backend('keyword') is None
+        assert get_backend('does-not-exist') is None
+        assert isinstance(get_backend('embedding'), HashedEmbeddingBackend)
+    
+    def test_verse_manager_uses_backend_for_queries(self):
+        """Test that VerseManager routes raw queries through the configured backend."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path, backend='embedding')
+            verse = manager.pick_verse(query="so much heaviness in my heart", top_k=1)
+            assert verse['ref'] == 'Test 1:1'
+        finally:
+            Path(temp_path).unlink()
@@ -0,0 +1,53 @@
+"""Tests for the near-duplicate response cache."""
+import pytest
+from semantic_cache import SemanticCache, build_semantic_cache
+
+class TestSemanticCache:
+    """Test cases for SemanticCache matching rules and counters."""
+
+    def setup_method(self):
+        """Set up a cache holding one anxiety response."""
+        self.cache = SemanticCache(threshold=0.8)
+        self.cache.add('general', 'I am anxious about my job interview', 'interview answer')
+
+    def test_reworded_message_hits(self):
+        """Test that the same concern in other words is served from the cache."""
+        assert self.cache.lookup('general', "I'm so anxious about the job interview tomorrow") == 'interview answer'
+        assert self.cache.stats()['calls_saved'] == 1
+
+    def test_different_concern_misses(self):
+        """Test that same-keyword messages about something else fall through."""
+        assert self.cache.lookup('general', "I'm anxious about my son's surgery") is None
+        assert self.cache.lookup('general', 'I am not anxious about my job interview') is None
+        assert self.cache.lookup('programmer', 'I am anxious about my job interview') is None
+        assert self.cache.stats()['misses'] == 3
+
+    def test_default_threshold_rejects_extra_content(self):
+        """Test that an added content word changing the meaning misses at the default threshold."""
+        cache = SemanticCache()
+        cache.add('general', 'I am anxious about my mom', 'mom answer')
+        assert cache.lookup('general', 'I am anxious about my mom dying') is None
+        assert cache.lookup('general', "I'm so anxious about my mom") == 'mom answer'
+
+    def test_messages_without_keywords_are_skipped(self):
+        """Test that messages with no lexicon keyword are never matched or stored."""
+        self.cache.add('general', 'hello there', 'greeting')
+        assert self.cache.lookup('general', 'hello there') is None
+        stats = self.cache.stats()
+        assert stats['skipped'] == 1
+        assert stats['stores'] == 1
+
+    def test_bucket_limits(self):
+        """Test that buckets and their entries are bounded."""
+        cache = SemanticCache(maxsize=1, bucket_size=1)
+        cache.add('general', 'I feel so lonely', 'first')
+        cache.add('general', 'I feel so lonely tonight', 'second')
+        assert cache.lookup('general', 'so lonely') == 'second'
+        cache.add('general', 'I am anxious', 'anxious')
+        assert cache.lookup('general', 'so lonely') is None
+        assert cache.stats()['buckets'] == 1
+
+    def test_build_from_settings(self):
+        """Test that the configured threshold is used, or no cache when disabled."""
+        assert build_semantic_cache({'semantic_cache': False}) is None
+        assert build_semantic_cache({'semantic_cache_threshold': 0.9}).threshold == 0.9
@@ -0,0 +1,116 @@
+"""Tests for single-flight request coalescing."""
+import pytest
+import time
+import asyncio
+import threading
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from prompts import BIBLE_MOTIVATE_PROMPT
+from response_cache import ResponseCache, MemoryTier, cached_invoke, cached_ainvoke, cached_stream
+from semantic_cache import SemanticCache
+from single_flight import SingleFlight
+
+class SlowChatModel(FakeListChatModel):
+    """Fake model that takes a while to answer and counts its calls."""
+
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        type(self).calls += 1
+        time.sleep(0.05)
+        return super()._call(*args, **kwargs)
+
+class TestSingleFlight:
+    """Test cases for SingleFlight and its use by the cached chain calls."""
+
+    def setup_method(self):
+        """Set up prompt inputs and reset the call counter."""
+        SlowChatModel.calls = 0
+        self.inputs = {'user_input': 'I feel anxious', 'verse_ref': 'Test 1:1', 'verse_text': 'Fear not.'}
+
+    def _run_threads(self, target, count=8):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_threads_share_one_call(self):
+        """Test that concurrent threads with the same key run fn once."""
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'result'
+
+        assert self._run_threads(lambda: flight.do('key', work)) == ['result'] * 8
+        assert len(calls) == 1
+        assert flight.stats() == {'upstream_calls': 1, 'calls_saved': 7, 'in_flight': 0}
+
+    def test_errors_reach_every_waiter(self):
+        """Test that the leader's exception is raised for all waiters and the key is released."""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('upstream down')
+
+        async def main():
+            return await asyncio.gather(*(flight.ado('key', fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()['in_flight'] == 0
+
+    def test_cancelled_waiter_does_not_cancel_leader(self):
+        """Test that cancelling one waiter leaves the shared call running for the others."""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def main():
+            leader = asyncio.ensure_future(flight.ado('key', work))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flight.ado('key', work))
+            other = asyncio.ensure_future(flight.ado('key', work))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            return await leader, await other
+
+        assert asyncio.run(main()) == ('done', 'done')
+
+    def test_cached_invoke_coalesces_identical_prompts(self):
+        """Test that identical concurrent chain calls reach the model once, sync and async."""
+        flight = SingleFlight()
+        llm = SlowChatModel(responses=['shared answer'])
+
+        def call():
+            return cached_invoke(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=ResponseCache([]),
+                                 semantic=SemanticCache(), flight=flight)
+        assert self._run_threads(call) == ['shared answer'] * 8
+        assert SlowChatModel.calls == 1
+
+        async def main():
+            return await asyncio.gather(*(
+                cached_ainvoke(BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=ResponseCache([]),
+                               semantic=SemanticCache(), flight=flight)
+                for _ in range(5)
+            ))
+        assert asyncio.run(main()) == ['shared answer'] * 5
+        assert SlowChatModel.calls == 2
+        assert flight.stats()['calls_saved'] == 11
+
+    def test_stream_followers_receive_full_answer(self):
+        """Test that a stream started while an identical call is in flight gets its result."""
+        flight = SingleFlight()
+        llm = FakeListChatModel(responses=['streamed answer'], sleep=0.005)
+        results = self._run_threads(lambda: ''.join(cached_stream(
+            BIBLE_MOTIVATE_PROMPT, llm, self.inputs, cache=ResponseCache([MemoryTier()]),
+            semantic=SemanticCache(), flight=flight)), count=4)
+        assert results == ['streamed answer'] * 4
+        assert flight.stats()['in_flight'] == 0
@@ -0,0 +1,44 @@
+"""Tests for the tokenizer and stemmer."""
+import pytest
+from stemmer import stem, analyze, tokenize, STEM_CACHE_SIZE
+
+class TestStemmer:
+    """Test cases for stemming and analysis."""
+
+    def test_inflections_share_a_stem(self):
+        """Test that common inflections map to one key."""
+        groups = [
+            ('tired', 'tiring', 'tire'),
+            ('worries', 'worried', 'worry'),
+            ('hoping', 'hopes', 'hope'),
+            ('loved', 'loving', 'love'),
+            ('stopped', 'stop'),
+            ('sadness', 'sad'),
+            ('fearful', 'fear'),
+            ('stressed', 'stressful', 'stress'),
+            ('change', 'changed', 'changing', 'changes'),
+            ('believe', 'believed', 'believing'),
+            ('forgive', 'forgiving', 'forgives'),
+            ('peace', 'peaceful'),
+            ('trouble', 'troubled'),
+        ]
+        for group in groups:
+            assert len({stem(word) for word in group}) == 1, group
+
+    def test_short_and_protected_words(self):
+        """Test words the stemmer must leave alone."""
+        for word in ('sin', 'bug', 'need', 'anxious', 'jesus', 'bless', 'hope', 'love', '316'):
+            assert stem(word) == word
+
+    def test_analyze_strips_punctuation(self):
+        """Test that analysis tokenizes, lowercases and stems."""
+        assert tokenize("I'm TIRED.") == ['i', 'm', 'tired']
+        assert analyze("So anxious, and tired.") == ['so', 'anxious', 'and', 'tire']
+
+    def test_cache_is_bounded(self):
+        """Test that stems are memoized in a bounded LRU."""
+        assert stem.cache_info().maxsize == STEM_CACHE_SIZE
+        stem('comforted')
+        hits = stem.cache_info().hits
+        stem('comforted')
+        assert stem.cache_info().hits == hits + 1
@@ -1,9 +1,15 @@
 """Tests for utility functions."""
 import pytest
+import os
 import json
 import tempfile
+import threading
+import time
 from pathlib import Path
-from utils import VerseManager, extract_keywords_from_input
+import numpy as np
+from utils import (VerseManager, extract_keywords_from_input, get_verse_manager,
+                   invalidate_verse_managers, load_verses, keyword_cache_stats,
+                   extract_keywords_batch)
 
 class TestVerseManager:
     """Test cases for VerseManager class."""
@@ -85,6 +91,272 @@ class TestVerseManager:
             assert wisdom_verses[0]['ref'] == 'Test 3:3'
         finally:
             Path(temp_path).unlink()
+    
+    def test_tag_index_is_case_insensitive(self):
+        """Test that topic lookups ignore tag and topic casing."""
+        self.test_verses[2]['tags'] = ["Wisdom", "guidance"]
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            assert [v['ref'] for v in manager.get_verses_by_tag('WISDOM')] == ['Test 3:3']
+            assert manager.pick_verse(topic='wisdom')['ref'] == 'Test 3:3'
+            assert manager.get_verses_by_tag('missing') == []
+        finally:
+            Path(temp_path).unlink()
+    
+    def test_pick_verse_unknown_topic_falls_back(self):
+        """Test that an unknown topic still returns a verse from the corpus."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            verse = manager.pick_verse(topic='nonexistent', keywords=['wisdom'])
+            assert verse['ref'] == 'Test 3:3'
+        finally:
+            Path(temp_path).unlink()
+
+    def test_search_verses_token_index(self):
+        """Test AND/OR search and the substring slow path."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            assert [v['ref'] for v in manager.search_verses('another TEST')] == ['Test 2:2']
+            assert [v['ref'] for v in manager.search_verses('strength wisdom')] == []
+            assert [v['ref'] for v in manager.search_verses('strength wisdom', match='any')] == ['Test 1:1', 'Test 3:3']
+            assert manager.search_verses('and courage', substring=True) == manager.search_verses('courage and')
+            assert manager.search_verses('courage and', substring=True) == []
+        finally:
+            Path(temp_path).unlink()
+    
+    def test_search_matches_inflections(self):
+        """Test that indexed verses and queries are stemmed the same way."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            assert [v['ref'] for v in manager.search_verses("Comforts!")] == ['Test 2:2']
+            assert manager.find_verse_ids(['verses', 'guiding']) == [0, 1, 2]
+            assert manager.pick_verse(keywords=['peaceful'])['ref'] == 'Test 2:2'
+        finally:
+            Path(temp_path).unlink()
+    
+    def test_candidate_cache(self):
+        """Test that repeated keyword picks reuse cached candidates until the corpus reloads."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            for keywords in (['Peace', 'comfort'], ['comfort', 'peace']):
+                assert manager.pick_verse(topic='test', keywords=keywords)['ref'] == 'Test 2:2'
+            assert manager.pick_verse(keywords=['wisdom'], ranked=True)['ref'] == 'Test 3:3'
+            assert manager.pick_verse(keywords=['wisdom'], ranked=True)['ref'] == 'Test 3:3'
+            assert manager.cache_stats()['hits'] == 2
+            assert manager.cache_stats()['misses'] == 2
+            # Candidate sets are held as compact int32 arrays and counted against the id budget
+            cached = manager._state.candidates.get(('filter', 'test', frozenset(['peace', 'comfort']), False))
+            assert cached.dtype == np.int32
+            assert manager.cache_stats()['weight'] <= manager.CANDIDATE_CACHE_IDS
+            
+            manager.load_verses()
+            assert manager.cache_stats()['size'] == 0
+        finally:
+            Path(temp_path).unlink()
+    
+    def test_keyword_matching_token_vs_substring(self):
+        """Test that keywords match whole tokens unless substring matching is requested."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            assert manager.find_verse_ids(['guid']) == []
+            assert manager.find_verse_ids(['Test 3']) == [2]
+            assert manager.pick_verse(keywords=['guid'], substring=True)['ref'] == 'Test 3:3'
+        finally:
+            Path(temp_path).unlink()
+
+    def test_rank_verses_bm25(self):
+        """Test that verses matching more keywords rank higher and expose scores."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            ranking = manager.rank_verses(['strength', 'courage', 'peace'], top_k=2)
+            assert [verse['ref'] for verse, _ in ranking] == ['Test 1:1', 'Test 2:2']
+            assert ranking[0][1] > ranking[1][1] > 0
+            
+            assert manager.rank_verses(['strength', 'peace'], topic='comfort') == [
+                (manager._verses[1], pytest.approx(ranking[1][1]))
+            ]
+            assert manager.rank_verses(['nothing']) == []
+            assert manager.pick_verse(keywords=['wisdom'], ranked=True)['ref'] == 'Test 3:3'
+        finally:
+            Path(temp_path).unlink()
+
+    def test_score_batch_tfidf(self):
+        """Test batch TF-IDF scoring returns top verse ids per query in input order."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            temp_path = f.name
+        
+        try:
+            manager = VerseManager(temp_path)
+            results = manager.score_batch(
+                ["I need wisdom and guidance", "peace", "nothing relevant here", "courage courage test"],
+                top_k=2,
+                batch_size=2,
+            )
+            assert results[0][0] == 2
+            assert results[1] == [1]
+            assert results[2] == []
+            assert results[3][0] == 0 and len(results[3]) == 2
+            assert manager.score_batch([]) == []
+        finally:
+            Path(temp_path).unlink()
+
+class TestVerseManagerRegistry:
+    """Test cases for the shared VerseManager registry."""
+    
+    def setup_method(self):
+        """Write a small verses file."""
+        self.test_verses = [
+            {"ref": "Test 1:1", "text": "A verse about strength.", "tags": ["strength"]},
+            {"ref": "Test 2:2", "text": "A verse about peace.", "tags": ["peace"]},
+        ]
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(self.test_verses, f)
+            self.temp_path = f.name
+    
+    def teardown_method(self):
+        """Remove the verses file and drop cached managers."""
+        invalidate_verse_managers()
+        Path(self.temp_path).unlink()
+    
+    def test_managers_are_shared(self):
+        """Test that every caller gets the same manager, including concurrent ones."""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_verse_manager(self.temp_path)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(manager) for manager in results}) == 1
+        assert get_verse_manager(self.temp_path) is results[0]
+        # A different backend gets its own manager
+        assert get_verse_manager(self.temp_path, backend='embedding') is not results[0]
+    
+    def test_reload_on_mtime_change_and_invalidate(self):
+        """Test that changed files reload the manager and invalidation replaces it."""
+        first = get_verse_manager(self.temp_path)
+        
+        with open(self.temp_path, 'w') as f:
+            json.dump(self.test_verses[:1], f)
+        stat = os.stat(self.temp_path)
+        os.utime(self.temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        # The shared manager reloads in place, so existing holders see the change too
+        assert get_verse_manager(self.temp_path) is first
+        assert len(first._verses) == 1
+        
+        invalidate_verse_managers(self.temp_path)
+        assert get_verse_manager(self.temp_path) is not first
+    
+    def test_load_verses_returns_copy(self):
+        """Test that the compatibility loader does not expose the shared corpus."""
+        verses = load_verses(self.temp_path)
+        verses.clear()
+        assert len(load_verses(self.temp_path)) == 2
+
+class TestVerseManagerHotReload:
+    """Test cases for watching and hot-reloading the verses file."""
+    
+    def setup_method(self):
+        """Write a small verses file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'verses.json'
+        self._write([{"ref": "Old 1:1", "text": "Old verse about peace.", "tags": ["peace"]}])
+    
+    def teardown_method(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+    
+    def _write(self, verses):
+        """Replace the verses file atomically (new inode), like most editors do."""
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(verses))
+        os.replace(temp_path, self.path)
+    
+    def _wait_for(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+    
+    def test_watch_reloads_changed_file(self):
+        """Test that the watcher swaps in the new verses."""
+        manager = VerseManager(str(self.path))
+        manager.watch(interval=0.02)
+        try:
+            assert manager.is_watching
+            self._write([{"ref": "New 1:1", "text": "New verse about hope.", "tags": ["hope"]},
+                         {"ref": "New 2:2", "text": "Another new verse.", "tags": ["peace"]}])
+            assert self._wait_for(lambda: len(manager._verses) == 2)
+            assert manager.pick_verse(topic='hope')['ref'] == 'New 1:1'
+        finally:
+            manager.stop_watching()
+        assert not manager.is_watching
+    
+    def test_invalid_change_keeps_old_verses(self):
+        """Test that a broken edit keeps serving the previous verses."""
+        manager = VerseManager(str(self.path))
+        self.path.write_text('[{"ref": "Half')
+        assert manager.check_for_changes()
+        assert manager.pick_verse()['ref'] == 'Old 1:1'
+        # The broken file is not re-read until it changes again
+        assert not manager.check_for_changes()
+    
+    def test_reads_during_reload_see_consistent_state(self):
+        """Test that pick_verse never sees verses and index from different loads."""
+        manager = VerseManager(str(self.path))
+        errors = []
+        done = threading.Event()
+        
+        def reader():
+            while not done.is_set():
+                try:
+                    verse = manager.pick_verse(topic='peace', keywords=['peace'], ranked=True)
+                    assert 'peace' in verse['tags']
+                except Exception as e:
+                    errors.append(e)
+        
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for size in range(2, 12):
+            self._write([{"ref": f"V {i}", "text": f"Verse {i}", "tags": ["peace" if i == size - 1 else "other"]}
+                         for i in range(size)])
+            manager.load_verses()
+        done.set()
+        for thread in threads:
+            thread.join()
+        assert errors == []
 
 class TestKeywordExtraction:
     """Test cases for keyword extraction."""
@@ -113,4 +385,47 @@ class TestKeywordExtraction:
         """Test that keyword extraction is case insensitive."""
         keywords = extract_keywords_from_input("I'm SCARED and Worried")
         assert 'fear' in keywords
-        assert 'anxiety' in keywords
\ No newline at end of file
+        assert 'anxiety' in keywords
+    
+    def test_extract_keywords_word_prefixes(self):
+        """Test that keys match at word starts (inflections) but not inside other words."""
+        assert set(extract_keywords_from_input("Endless bugs, I'm stressed!")) == {'patience', 'strength', 'peace', 'rest'}
+        assert extract_keywords_from_input("I keep using the wrong branch") == []
+    
+    def test_extract_keywords_punctuation_and_inflections(self):
+        """Test that punctuation and inflected forms still hit lexicon entries."""
+        assert set(extract_keywords_from_input("So anxious, and tiring.")) == {'anxiety', 'peace', 'rest', 'strength'}
+        assert set(extract_keywords_from_input("My bug fails")) >= {'patience', 'hope'}
+    
+    def test_extract_keywords_cache(self):
+        """Test that repeated messages hit the cache and callers get their own lists."""
+        first = extract_keywords_from_input("  Feeling LONELY tonight ")
+        hits = keyword_cache_stats()['hits']
+        second = extract_keywords_from_input("feeling lonely tonight")
+        assert keyword_cache_stats()['hits'] == hits + 1
+        assert second == first
+        second.append('extra')
+        assert 'extra' not in extract_keywords_from_input("feeling lonely tonight")
+    
+    def test_extract_keywords_legacy_partial(self):
+        """Test that the legacy flag keeps the old word-in-key partial matching."""
+        assert extract_keywords_from_input("a") == []
+        assert set(extract_keywords_from_input("a", legacy_partial=True)) == {'fear', 'courage'}
+        assert set(extract_keywords_from_input("using", legacy_partial=True)) == {'grace', 'forgiveness'}
+    
+    def test_extract_keywords_batch_matches_single_calls(self):
+        """Test that batch results equal per-message results, in input order."""
+        messages = ["I'm scared", "Hello world", "stuck on a BUG", "i'm scared ", "tired and alone"]
+        expected = [extract_keywords_from_input(message, context='programmer') for message in messages]
+        results = extract_keywords_batch(messages, context='programmer')
+        assert results == expected
+        results[0].append('extra')
+        assert 'extra' not in results[3]
+        assert extract_keywords_batch([]) == []
+    
+    def test_extract_keywords_batch_process_pool(self, monkeypatch):
+        """Test that the process pool path keeps input order."""
+        monkeypatch.setattr('utils.POOL_MIN_BATCH', 1)
+        messages = [f"message {i} {'worried' if i % 3 else 'lonely'}" for i in range(40)]
+        expected = [extract_keywords_from_input(message) for message in messages]
+        assert extract_keywords_batch(messages, processes=2, chunk_size=7) == expected
@@ -0,0 +1,40 @@
+"""Tests for the Verse record type."""
+import pytest
+import json
+import pickle
+from verse import Verse, to_verses
+
+class TestVerse:
+    """Test cases for Verse."""
+
+    def setup_method(self):
+        """Set up test data."""
+        self.data = {"ref": "Test 1:1", "text": "Be Strong and of a good courage.", "tags": ["Strength", "courage"]}
+
+    def test_dict_style_access(self):
+        """Test that existing dict-style callers keep working."""
+        verse = Verse.from_dict(self.data)
+        assert verse['ref'] == 'Test 1:1'
+        assert verse.get('text') == self.data['text']
+        assert 'courage' in verse['tags']
+        assert verse.get('missing', 'default') == 'default'
+        with pytest.raises(KeyError):
+            verse['missing']
+        assert verse == self.data
+        assert json.loads(json.dumps(verse.to_dict())) == self.data
+
+    def test_precomputed_fields(self):
+        """Test lowercased text, interned tags and slot-only storage."""
+        first, second = to_verses([self.data, dict(self.data, ref="Test 2:2")])
+        assert first.text_lower == self.data['text'].lower()
+        assert first.tag_keys == ('strength', 'courage')
+        assert first.tags[0] is second.tags[0]
+        assert first.tag_keys[0] is second.tag_keys[0]
+        assert not hasattr(first, '__dict__')
+        with pytest.raises(AttributeError):
+            first.extra = 1
+
+    def test_pickle_round_trip(self):
+        """Test that verses survive pickling (e.g. for process pools)."""
+        verse = Verse.from_dict(self.data)
+        assert pickle.loads(pickle.dumps(verse)) == verse
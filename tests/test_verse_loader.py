@@ -0,0 +1,97 @@
+"""Tests for the streaming verse loader."""
+import pytest
+import json
+import tempfile
+from pathlib import Path
+from verse_index import VerseIndex
+from verse_loader import iter_verse_records, load_verse_file
+from utils import VerseManager
+
+class TestVerseLoader:
+    """Test cases for streaming JSON array and JSON Lines verse files."""
+
+    def setup_method(self):
+        """Set up test data in a temporary directory."""
+        self.test_verses = [
+            {"ref": "Test 1:1", "text": "Be strong, \"and\" of a good courage. ]", "tags": ["strength", "courage"]},
+            {"ref": "Test 2:2", "text": "Peace I leave with you.", "tags": ["peace"], "commentary": "x" * 100},
+            {"ref": "Psaume 3:3", "text": "L'Éternel est mon berger.", "tags": ["comfort"]},
+        ]
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.temp_dir.name)
+
+    def teardown_method(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+
+    def _write(self, name: str, content: str) -> Path:
+        path = self.dir / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def test_json_array_across_chunk_boundaries(self):
+        """Test that elements split across tiny chunks parse correctly."""
+        path = self._write('verses.json', json.dumps(self.test_verses, indent=2, ensure_ascii=False))
+        for chunk_size in (1, 7, 64, 1 << 20):
+            assert list(iter_verse_records(path, chunk_size=chunk_size)) == self.test_verses
+
+    def test_json_lines(self):
+        """Test JSON Lines files, detected by suffix or content, with blank lines."""
+        content = '\n'.join(json.dumps(verse) for verse in self.test_verses) + '\n\n'
+        for name in ('verses.jsonl', 'verses.json'):
+            assert list(iter_verse_records(self._write(name, content))) == self.test_verses
+
+    def test_load_builds_index_and_reports_progress(self):
+        """Test that streaming produces the same index as a full build."""
+        path = self._write('verses.json', json.dumps(self.test_verses))
+        reports = []
+        verses, index = load_verse_file(path, on_progress=reports.append, progress_interval=0)
+
+        assert verses == [{key: verse[key] for key in ('ref', 'text', 'tags')} for verse in self.test_verses]
+        assert 'commentary' not in verses[1]
+        built = VerseIndex.build(self.test_verses)
+        assert index.tag_index == built.tag_index
+        assert index.find(['peace', 'berger']) == built.find(['peace', 'berger'])
+        assert len(reports) == len(self.test_verses)
+        assert reports[-1].verses == len(self.test_verses)
+        assert reports[-1].bytes_read == path.stat().st_size
+
+    def test_index_built_in_chunks(self, monkeypatch):
+        """Test that indexing a chunk at a time matches indexing everything at once."""
+        built = VerseIndex.build(self.test_verses * 3)
+        monkeypatch.setattr('verse_index.VerseIndexBuilder.CHUNK_VERSES', 2)
+        chunked = VerseIndex.build(self.test_verses * 3)
+        assert chunked.vocabulary == built.vocabulary
+        for field in ('term_indptr', 'term_verse_ids', 'bm25_weights', 'tfidf_weights'):
+            assert getattr(chunked, field).tolist() == pytest.approx(getattr(built, field).tolist())
+        for token in built.search_vocab:
+            assert chunked.postings(token).tolist() == built.postings(token).tolist()
+        assert chunked.find(['peace', 'test']) == [0, 1, 3, 4, 6, 7]
+
+    def test_invalid_files(self):
+        """Test that malformed files raise JSONDecodeError and VerseManager degrades to no verses."""
+        for content in ('{"ref": "a"', '[{"ref": "a"}', '[{"ref": "a"} {"ref": "b"}]', '[{"ref": "a"},]', '"verses"',
+                        '[{"ref": "a"}] x', '[{"ref": "a"}]\n[]'):
+            path = self._write('bad.json', content)
+            with pytest.raises(json.JSONDecodeError):
+                list(iter_verse_records(path))
+            assert VerseManager(str(path))._verses == []
+
+    def test_non_verse_records(self):
+        """Test that non-object or empty records are rejected and VerseManager keeps running."""
+        for name, content in (('numbers.json', '[1, 2]'), ('empty.json', '{}'), ('object.json', '{"ref": "a"}\n{'),
+                              ('null_tags.json', '[{"ref": "a", "tags": null}]'),
+                              ('string_tags.json', '[{"ref": "a", "tags": "peace"}]'),
+                              ('number_tags.json', '[{"ref": "a", "tags": [1]}]'),
+                              ('number_text.json', '[{"ref": "a", "text": 5}]')):
+            path = self._write(name, content)
+            with pytest.raises(ValueError):
+                load_verse_file(path, on_progress=None)
+            assert VerseManager(str(path))._verses == []
+
+    def test_verse_manager_loads_json_lines(self):
+        """Test that VerseManager accepts JSON Lines files."""
+        path = self._write('verses.jsonl', '\n'.join(json.dumps(verse) for verse in self.test_verses))
+        manager = VerseManager(str(path))
+        assert len(manager._verses) == 3
+        assert manager.pick_verse(topic='peace')['ref'] == 'Test 2:2'
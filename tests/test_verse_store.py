@@ -0,0 +1,80 @@
+"""Tests for the compiled binary verse corpus."""
+import pytest
+import os
+import json
+import tempfile
+import numpy as np
+from pathlib import Path
+from verse_index import VerseIndex
+from verse_store import compile_corpus, load_corpus, find_compiled, compiled_path_for
+from utils import VerseManager
+
+class TestVerseStore:
+    """Test cases for compiling and memory-mapping verse corpora."""
+
+    def setup_method(self):
+        """Set up test data in a temporary directory."""
+        self.test_verses = [
+            {"ref": "Test 1:1", "text": "Be strong and of a good courage.", "tags": ["strength", "Courage"]},
+            {"ref": "Test 2:2", "text": "Peace I leave with you, my peace I give unto you.", "tags": ["peace", "comfort"]},
+            {"ref": "Psaume 3:3", "text": "L'Éternel est mon berger.", "tags": ["courage"]},
+            {"ref": "Test 4:4", "text": "", "tags": []},
+        ]
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = Path(self.temp_dir.name) / 'verses.json'
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.test_verses, f)
+
+    def teardown_method(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+
+    def test_round_trip_verses(self):
+        """Test that compiled verses decode back to the original dicts."""
+        target = compile_corpus(self.json_path)
+        assert target == compiled_path_for(self.json_path)
+
+        corpus = load_corpus(target)
+        assert len(corpus.verses) == len(self.test_verses)
+        assert list(corpus.verses) == self.test_verses
+        assert corpus.verses[-1] == self.test_verses[-1]
+        with pytest.raises(IndexError):
+            corpus.verses[len(self.test_verses)]
+
+    def test_index_matches_built_index(self):
+        """Test that the mapped index answers queries like a freshly built one."""
+        corpus = load_corpus(compile_corpus(self.json_path))
+        built = VerseIndex.build(self.test_verses)
+
+        # Tags differing only in case are merged, as in the built index
+        assert corpus.index.tag_index == built.tag_index
+        assert corpus.index.tag_ids('COURAGE') == [0, 2]
+        assert corpus.index.find(['peace', 'courage']) == built.find(['peace', 'courage'])
+        assert np.allclose(corpus.index.bm25_scores(['peace']), built.bm25_scores(['peace']))
+        assert corpus.index.score_batch(['peace', 'strong courage']) == built.score_batch(['peace', 'strong courage'])
+
+    def test_find_compiled_freshness(self):
+        """Test that a sibling corpus is only used while it matches the JSON file."""
+        assert find_compiled(self.json_path) is None
+        target = compile_corpus(self.json_path)
+        assert find_compiled(self.json_path) == target
+        assert find_compiled(target) == target
+
+        # Editing the JSON makes the compiled corpus stale
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.test_verses[:1], f)
+        stat = self.json_path.stat()
+        os.utime(self.json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert find_compiled(self.json_path) is None
+
+    def test_verse_manager_uses_compiled_corpus(self):
+        """Test that VerseManager loads the compiled corpus and falls back to JSON when it is invalid."""
+        target = compile_corpus(self.json_path)
+        manager = VerseManager(str(target))
+        assert len(manager._verses) == len(self.test_verses)
+        assert manager.pick_verse(topic='peace')['ref'] == 'Test 2:2'
+        assert manager.search_verses('berger') == [self.test_verses[2]]
+
+        target.write_bytes(b'not a corpus')
+        manager = VerseManager(str(self.json_path))
+        assert len(manager._verses) == len(self.test_verses)
@@ -2,100 +2,410 @@ import random
 import json
 import os
 import logging
-from typing import List, Dict, Optional, Any
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Dict, Optional, Any, Tuple, NamedTuple, Sequence
 from pathlib import Path
+import numpy as np
+from retrieval import RetrievalBackend, get_backend
+from verse import Verse
+from verse_index import VerseIndex, tokenize
+import verse_store
+from verse_loader import load_verse_file
+from lexicon import get_lexicon
+from lru import LRUCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _resolve_verses_path(verses_path: str) -> Path:
+    """Resolve a verses path; relative paths are relative to this module."""
+    path = Path(verses_path)
+    if not path.is_absolute():
+        path = Path(__file__).parent / path
+    return path.resolve()
+
+class _CorpusState(NamedTuple):
+    """Everything derived from one load of the verses file, swapped as a unit."""
+    verses: Sequence[Verse]
+    index: VerseIndex
+    backend: Optional[RetrievalBackend]
+    signature: Optional[Tuple[int, int, int]]
+    # Keyword -> candidate verse ids; lives with the index it was computed from
+    candidates: LRUCache
+
+def _cached_ids(value: Any) -> int:
+    """Weigh a candidate cache entry by the number of verse ids it holds."""
+    return 1 if value is None else max(1, len(value))
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Get (inode, mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
 class VerseManager:
     """Manages Bible verses with improved selection algorithms."""
     
-    def __init__(self, verses_path: str = 'bible_verses.json'):
-        self.verses_path = Path(verses_path)
-        self._verses: List[Dict[str, Any]] = []
+    # Cached candidate sets per loaded corpus (see pick_verse), bounded both by
+    # entries and by the verse ids they hold (int32, so 4 MB at most)
+    CANDIDATE_CACHE_SIZE = 1024
+    CANDIDATE_CACHE_IDS = 1 << 20
+    
+    def __init__(self, verses_path: str = 'bible_verses.json', backend: Optional[str] = None):
+        self.verses_path = _resolve_verses_path(verses_path)
+        self.backend_name = backend
+        # Readers take one reference to the state and use only it, so a reload
+        # swapping in a new state never exposes a half-built index
+        self._state = _CorpusState([], VerseIndex.empty(), None, None, LRUCache(0))
+        self._reload_lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
         self.load_verses()
     
-    def load_verses(self) -> List[Dict[str, Any]]:
-        """Load verses from JSON file with error handling."""
-        try:
-            if not self.verses_path.is_absolute():
-                self.verses_path = Path(__file__).parent / self.verses_path
-            
-            with open(self.verses_path, 'r', encoding='utf-8') as f:
-                self._verses = json.load(f)
+    @property
+    def _verses(self) -> Sequence[Verse]:
+        return self._state.verses
+    
+    @property
+    def _index(self) -> VerseIndex:
+        return self._state.index
+    
+    @property
+    def _backend(self) -> Optional[RetrievalBackend]:
+        return self._state.backend
+    
+    @property
+    def source_signature(self) -> Optional[Tuple[int, int, int]]:
+        """(inode, mtime_ns, size) of the verses file when it was last loaded."""
+        return self._state.signature
+    
+    def _load_state(self) -> _CorpusState:
+        """Load verses, indexes and backend into a new state without touching the current one."""
+        signature = _file_signature(self.verses_path)
+        compiled = verse_store.find_compiled(self.verses_path)
+        verses = index = None
+        if compiled is not None:
+            try:
+                corpus = verse_store.load_corpus(compiled)
+                verses, index = corpus.verses, corpus.index
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load compiled corpus {compiled}: {e}")
+                compiled = None
+        if compiled is None:
+            verses, index = load_verse_file(self.verses_path)
+        
+        backend = get_backend(self.backend_name)
+        if backend is not None:
+            backend.build(verses)
+        logger.info(f"Loaded {len(verses)} verses from {compiled or self.verses_path}")
+        candidates = LRUCache(self.CANDIDATE_CACHE_SIZE, weigh=_cached_ids, maxweight=self.CANDIDATE_CACHE_IDS)
+        return _CorpusState(verses, index, backend, signature, candidates)
+    
+    def load_verses(self) -> Sequence[Verse]:
+        """
+        Load verses and their indexes.
+        
+        A compiled corpus (a .bvc path, or an up-to-date .bvc next to the JSON
+        file, see verse_store.py) is memory-mapped with its prebuilt indexes;
+        otherwise the JSON array or JSON Lines file is streamed and indexed
+        verse by verse (see verse_loader.py). On failure the previously loaded
+        verses stay in use.
+        """
+        with self._reload_lock:
+            try:
+                self._state = self._load_state()
+                return self._state.verses
             
-            logger.info(f"Loaded {len(self._verses)} verses from {self.verses_path}")
-            return self._verses
+            except FileNotFoundError:
+                logger.error(f"Verses file not found: {self.verses_path}")
+                return []
+            except json.JSONDecodeError as e:
+                logger.error(f"Invalid JSON in verses file: {e}")
+                return []
+            except ValueError as e:
+                logger.error(f"Invalid verses file: {e}")
+                return []
+    
+    def check_for_changes(self) -> bool:
+        """
+        Reload the verses if the file changed since the last load.
+        
+        Returns:
+            True if the file changed (and a reload was attempted)
+        """
+        signature = _file_signature(self.verses_path)
+        if signature is None or signature == self._state.signature:
+            return False
+        logger.info(f"Verses file changed, reloading: {self.verses_path}")
+        self.load_verses()
+        if self._state.signature != signature:
+            # Keep serving the old verses, but do not retry until the file changes again
+            self._state = self._state._replace(signature=signature)
+        return True
+    
+    def watch(self, interval: float = 2.0):
+        """
+        Start polling the verses file and hot-reload it when it changes.
+        
+        Changes are detected by inode, mtime and size, so both in-place edits
+        and atomic replace-by-rename are picked up. Rebuilding happens on a
+        daemon thread while the old verses keep serving requests.
+        
+        Args:
+            interval: Seconds between checks
+        """
+        if self.is_watching:
+            return
+        self._watch_stop.clear()
+        
+        def poll():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    logger.error(f"Error reloading verses: {e}")
+        
+        self._watch_thread = threading.Thread(target=poll, name='verse-watch', daemon=True)
+        self._watch_thread.start()
+        logger.info(f"Watching {self.verses_path} for changes every {interval}s")
+    
+    def stop_watching(self):
+        """Stop the file watcher started by watch()."""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+    
+    @property
+    def is_watching(self) -> bool:
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+    
+    def find_verse_ids(self, terms: List[str], match: str = 'any') -> List[int]:
+        """
+        Find verse ids matching the given terms using the token index.
+        
+        Args:
+            terms: Words or phrases to look up in tags, text and reference
+            match: 'any' (OR) or 'all' (AND) across terms
+        
+        Returns:
+            Sorted list of matching verse ids
+        """
+        return self._index.find(terms, match=match)
+    
+    def score_verses(self, keywords: List[str]) -> np.ndarray:
+        """Get the BM25 score of every verse for the keywords (indexed by verse id)."""
+        return self._index.bm25_scores(keywords)
+    
+    def rank_verses(self, keywords: List[str], top_k: int = 5,
+                    topic: Optional[str] = None) -> List[Tuple[Verse, float]]:
+        """
+        Rank verses against keywords with BM25 over text and tags.
+        
+        Args:
+            keywords: Query terms (repeated terms weigh more)
+            top_k: Maximum number of results
+            topic: Optional tag restricting the results
+        
+        Returns:
+            List of (verse, score) pairs, best first
+        """
+        state = self._state
+        return [(state.verses[verse_id], score)
+                for verse_id, score in state.index.rank(keywords, top_k=top_k, topic=topic)]
+    
+    def score_batch(self, queries: List[str], top_k: int = 5, batch_size: int = 16) -> List[List[int]]:
+        """
+        Score many queries against every verse using the TF-IDF matrix.
+        
+        Each chunk of queries is scored with one sparse (queries x terms) @
+        (terms x verses) product, so the work is proportional to the postings
+        of the query terms rather than to corpus or vocabulary size.
         
-        except FileNotFoundError:
-            logger.error(f"Verses file not found: {self.verses_path}")
-            return []
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in verses file: {e}")
-            return []
+        Args:
+            queries: Free-text queries (user messages, keyword strings, ...)
+            top_k: Number of verse ids to return per query
+            batch_size: Queries per product; the dense score block is
+                batch_size x (verses touched by the chunk), so keep it small
+        
+        Returns:
+            Top verse ids per query (best first), in query order
+        """
+        return self._index.score_batch(queries, top_k=top_k, batch_size=batch_size)
     
-    def pick_verse(self, topic: Optional[str] = None, keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+    def pick_verse(self, topic: Optional[str] = None, keywords: Optional[List[str]] = None,
+                   substring: bool = False, ranked: bool = False, top_k: int = 5,
+                   query: Optional[str] = None, seed: Optional[str] = None) -> Verse:
         """
         Pick a verse based on topic or keywords with improved matching.
         
         Args:
             topic: Single topic to match against tags
             keywords: List of keywords to search in tags and text
+            substring: Match keywords as raw substrings (slow linear scan)
+            ranked: Sample from the top_k BM25-ranked verses, weighted by score
+            top_k: Number of ranked verses to sample from
+            query: Raw user message for the configured retrieval backend (if any)
+            seed: Make the random choice deterministic (see verse_seed), so the
+                same message renders the same prompt and can share a response
         
         Returns:
-            Dictionary containing verse data
+            Verse record (supports dict-style access)
         """
-        if not self._verses:
+        rng = random.Random(seed) if seed is not None else random
+        # One snapshot for the whole call, in case a reload swaps the state meanwhile
+        state = self._state
+        verses = state.verses
+        if not verses:
             logger.warning("No verses available")
-            return {"ref": "Psalm 23:1", "text": "The LORD is my shepherd; I shall not want.", "tags": ["comfort"]}
+            return Verse("Psalm 23:1", "The LORD is my shepherd; I shall not want.", ("comfort",))
+        
+        if state.backend is not None and query:
+            # Unknown topics do not restrict the search, mirroring the filters below
+            candidates = (state.index.tag_ids(topic) or None) if topic else None
+            search_text = ' '.join([query] + list(keywords or []))
+            matches = state.backend.search(search_text, top_k=top_k, candidates=candidates)
+            if matches:
+                verse_ids, scores = zip(*matches)
+                return verses[rng.choices(verse_ids, weights=scores)[0]]
+        
+        if ranked and keywords:
+            # Like the filters below, an unknown topic does not restrict the ranking
+            ranked_topic = topic if topic and state.index.has_tag(topic) else None
+            # Repeated terms weigh more in BM25, so the key keeps duplicates
+            rank_key = ('rank', ranked_topic and ranked_topic.lower(),
+                        tuple(sorted(k.lower() for k in keywords)), top_k)
+            ranking = state.candidates.get_or_compute(
+                rank_key, lambda: state.index.rank(keywords, top_k=top_k, topic=ranked_topic))
+            if ranking:
+                verse_ids, scores = zip(*ranking)
+                return verses[rng.choices(verse_ids, weights=scores)[0]]
         
-        candidates = self._verses.copy()
+        # Filtering depends only on the normalized inputs, so repeated messages reuse it
+        filter_key = ('filter', topic and topic.lower(), frozenset(k.lower() for k in keywords or ()), substring)
+        candidates = state.candidates.get_or_compute(
+            filter_key, lambda: self._filter_candidates(state, topic, keywords, substring))
+        
+        if candidates is None:
+            return rng.choice(verses)
+        return verses[int(rng.choice(candidates))]
+    
+    def _filter_candidates(self, state: _CorpusState, topic: Optional[str],
+                           keywords: Optional[List[str]], substring: bool) -> Optional[np.ndarray]:
+        """Get the verse ids pick_verse chooses from (None means the whole corpus)."""
+        verses = state.verses
+        # Candidates are int32 verse ids; None means "the whole corpus" so we never copy it
+        candidates: Optional[np.ndarray] = None
         
         # Filter by topic if provided
         if topic:
-            topic_matches = [v for v in candidates if self._matches_topic(v, topic)]
-            if topic_matches:
-                candidates = topic_matches
+            topic_matches = state.index.tag_ids(topic)
+            if len(topic_matches):
+                candidates = np.asarray(topic_matches, dtype=np.int32)
         
         # Filter by keywords if provided
         if keywords:
-            keyword_matches = [v for v in candidates if self._matches_keywords(v, keywords)]
-            if keyword_matches:
+            if substring:
+                pool = range(len(verses)) if candidates is None else candidates
+                keyword_matches = np.fromiter(
+                    (i for i in pool if self._matches_keywords(verses[i], keywords)), dtype=np.int32)
+            else:
+                keyword_matches = state.index.find_ids(keywords)
+                if candidates is not None and len(keyword_matches):
+                    keyword_matches = state.index.intersect(candidates, keyword_matches)
+            if len(keyword_matches):
                 candidates = keyword_matches
-        
-        return random.choice(candidates)
+        return candidates
     
-    def _matches_topic(self, verse: Dict[str, Any], topic: str) -> bool:
+    def cache_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters of the candidate cache for the loaded corpus."""
+        return self._state.candidates.stats()
+    
+    def _matches_topic(self, verse: Verse, topic: str) -> bool:
         """Check if verse matches a specific topic."""
-        tags = verse.get('tags', [])
-        return topic.lower() in [tag.lower() for tag in tags]
+        return topic.lower() in verse.tag_keys
     
-    def _matches_keywords(self, verse: Dict[str, Any], keywords: List[str]) -> bool:
+    def _matches_keywords(self, verse: Verse, keywords: List[str]) -> bool:
         """Check if verse matches any of the provided keywords."""
-        tags = verse.get('tags', [])
-        text = verse.get('text', '').lower()
-        ref = verse.get('ref', '').lower()
+        ref = verse.ref.lower()
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if keyword in verse.text_lower or keyword in ref or any(keyword in tag for tag in verse.tag_keys):
+                return True
+        return False
+    
+    def get_verses_by_tag(self, tag: str) -> List[Verse]:
+        """Get all verses with a specific tag."""
+        state = self._state
+        return [state.verses[i] for i in state.index.tag_ids(tag)]
+    
+    def search_verses(self, query: str, match: str = 'all', substring: bool = False) -> List[Verse]:
+        """
+        Search verses by content.
         
-        search_text = f"{' '.join(tags)} {text} {ref}".lower()
+        Args:
+            query: Words to look for in tags, text and reference
+            match: 'all' (AND) or 'any' (OR) across query words
+            substring: Match the whole query as a raw substring of the text (slow linear scan)
         
-        return any(keyword.lower() in search_text for keyword in keywords)
+        Returns:
+            Matching verses in corpus order
+        """
+        if substring:
+            query = query.lower()
+            return [v for v in self._verses if query in v.text_lower]
+        state = self._state
+        return [state.verses[i] for i in state.index.find(tokenize(query), match=match)]
+
+# Process-wide VerseManager registry: (resolved path, backend) -> manager
+_managers: Dict[Tuple[str, Optional[str]], VerseManager] = {}
+_managers_lock = threading.Lock()
+
+def get_verse_manager(verses_path: str = 'bible_verses.json', backend: Optional[str] = None) -> VerseManager:
+    """
+    Get the shared VerseManager for a verses file.
     
-    def get_verses_by_tag(self, tag: str) -> List[Dict[str, Any]]:
-        """Get all verses with a specific tag."""
-        return [v for v in self._verses if self._matches_topic(v, tag)]
+    Every caller in the process gets the same parsed corpus and index. When
+    the file has changed since it was loaded, the shared manager reloads in
+    place (managers started with watch() reload themselves in the
+    background); use invalidate_verse_managers() to force a fresh manager.
     
-    def search_verses(self, query: str) -> List[Dict[str, Any]]:
-        """Search verses by text content."""
-        query = query.lower()
-        return [v for v in self._verses if query in v.get('text', '').lower()]
+    Args:
+        verses_path: Path to the verses file (relative to this module if not absolute)
+        backend: Retrieval backend name (see retrieval.get_backend)
+    
+    Returns:
+        Shared VerseManager instance
+    """
+    path = _resolve_verses_path(verses_path)
+    key = (str(path), backend)
+    # Loading under the lock means concurrent first callers parse the file only once
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = VerseManager(str(path), backend=backend)
+            _managers[key] = manager
+        elif not manager.is_watching:
+            manager.check_for_changes()
+        return manager
+
+def invalidate_verse_managers(verses_path: Optional[str] = None):
+    """Drop shared VerseManagers for one verses file, or all of them."""
+    with _managers_lock:
+        path = None if verses_path is None else str(_resolve_verses_path(verses_path))
+        for key in [key for key in _managers if path is None or key[0] == path]:
+            _managers.pop(key).stop_watching()
 
 # Backward compatibility functions
-def load_verses(path: str = 'bible_verses.json') -> List[Dict[str, Any]]:
+def load_verses(path: str = 'bible_verses.json') -> List[Verse]:
     """Load verses (backward compatibility)."""
-    manager = VerseManager(path)
-    return manager._verses
+    # Callers own the returned list, so hand out a copy of the shared corpus
+    return list(get_verse_manager(path)._verses)
 
 def pick_verse(topic: Optional[str] = None, verses: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """Pick a verse (backward compatibility)."""
@@ -107,86 +417,99 @@ def pick_verse(topic: Optional[str] = None, verses: Optional[List[Dict[str, Any]
                 return random.choice(choices)
         return random.choice(verses)
     
-    # Use new manager
-    manager = VerseManager()
-    return manager.pick_verse(topic=topic)
-
-def extract_keywords_from_input(user_input: str) -> List[str]:
-    """Extract potential keywords from user input for better verse matching."""
-    # Common emotional/spiritual keywords that might match verse tags
-    keyword_map = {
-        # Emotional states
-        'scared': ['fear', 'courage'],
-        'afraid': ['fear', 'courage'],
-        'worried': ['anxiety', 'peace'],
-        'anxious': ['anxiety', 'peace'],
-        'sad': ['comfort', 'sorrow'],
-        'depressed': ['comfort', 'hope'],
-        'tired': ['rest', 'strength'],
-        'exhausted': ['rest', 'strength'],
-        'alone': ['presence', 'comfort'],
-        'lonely': ['presence', 'comfort'],
-        'stuck': ['help', 'strength'],
-        'lost': ['guidance', 'help'],
-        'overwhelmed': ['peace', 'rest'],
-        'stressed': ['peace', 'rest'],
-        'discouraged': ['hope', 'strength'],
-        'hopeless': ['hope', 'assurance'],
-        'weak': ['strength', 'grace'],
-        'broken': ['comfort', 'healing'],
-        'hurt': ['comfort', 'healing'],
-        
-        # Programming/work related
-        'bug': ['patience', 'strength'],
-        'debugging': ['patience', 'wisdom'],
-        'error': ['patience', 'help'],
-        'failed': ['hope', 'strength'],
-        'failure': ['hope', 'strength'],
-        'deadline': ['peace', 'strength'],
-        'project': ['wisdom', 'strength'],
-        'work': ['strength', 'peace'],
-        'job': ['strength', 'guidance'],
-        'boss': ['patience', 'wisdom'],
-        'team': ['patience', 'love'],
-        'meeting': ['peace', 'wisdom'],
-        
-        # Life situations
-        'exam': ['peace', 'strength'],
-        'test': ['peace', 'strength'],
-        'interview': ['courage', 'peace'],
-        'family': ['love', 'patience'],
-        'relationship': ['love', 'wisdom'],
-        'money': ['trust', 'peace'],
-        'health': ['healing', 'strength'],
-        'future': ['hope', 'trust'],
-        'decision': ['wisdom', 'guidance'],
-        'change': ['courage', 'trust'],
-        
-        # Spiritual states
-        'doubt': ['assurance', 'trust'],
-        'faith': ['assurance', 'strength'],
-        'prayer': ['peace', 'guidance'],
-        'god': ['presence', 'love'],
-        'jesus': ['love', 'grace'],
-        'bible': ['wisdom', 'guidance'],
-        'church': ['community', 'love'],
-        'sin': ['grace', 'forgiveness'],
-        'forgiveness': ['grace', 'peace'],
-        'guilt': ['grace', 'peace'],
-    }
-    
-    words = user_input.lower().split()
-    keywords = []
-    
-    for word in words:
-        # Direct matches
-        if word in keyword_map:
-            keywords.extend(keyword_map[word])
-        
-        # Partial matches for common word endings
-        for key, values in keyword_map.items():
-            if key in word or word in key:
-                keywords.extend(values)
-                break
-    
-    return list(set(keywords))  # Remove duplicates
+    # Use the shared manager
+    return get_verse_manager().pick_verse(topic=topic)
+
+def verse_seed(message: str, mode: Optional[str] = None) -> str:
+    """
+    Seed for pick_verse that is the same for the same message in the same mode.
+
+    Identical messages then get the same verse, hence the same rendered
+    prompt, so concurrent ones coalesce into one model call.
+    """
+    return f"{mode or 'general'}\n{message.strip().lower()}"
+
+def _keyword_sections(context: Optional[str]) -> Tuple[str, ...]:
+    """Lexicon sections matched for a context."""
+    return ('general', context) if context and context != 'general' else ('general',)
+
+# Normalized input -> extracted keywords; messages repeat a lot
+KEYWORD_CACHE_SIZE = 4096
+_keyword_cache = LRUCache(KEYWORD_CACHE_SIZE)
+
+def extract_keywords_from_input(user_input: str, legacy_partial: bool = False,
+                                context: Optional[str] = None) -> List[str]:
+    """
+    Extract potential keywords from user input for better verse matching.
+    
+    Args:
+        user_input: Raw user message
+        legacy_partial: Use the original per-word partial matching, where a
+            word also matches any key containing it
+        context: Extra lexicon section to match (e.g. "programmer")
+    
+    Returns:
+        Verse tags suggested by the words in the input
+    """
+    sections = _keyword_sections(context)
+    # Matching is case-insensitive, so case and surrounding whitespace do not split cache entries
+    key = (user_input.strip().lower(), sections, legacy_partial)
+    keywords = _keyword_cache.get_or_compute(
+        key, lambda: get_lexicon().match(user_input, sections=sections, legacy_partial=legacy_partial))
+    # Callers extend the result, so never hand out the cached list itself
+    return list(keywords)
+
+def keyword_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counters of the extract_keywords_from_input cache."""
+    return _keyword_cache.stats()
+
+# Below this many distinct messages a process pool costs more than it saves
+POOL_MIN_BATCH = 2000
+
+def _extract_keywords_chunk(messages: List[str], sections: Tuple[str, ...],
+                            legacy_partial: bool) -> List[List[str]]:
+    """Match a chunk of messages (also the process pool worker)."""
+    lexicon = get_lexicon()
+    return [lexicon.match(message, sections=sections, legacy_partial=legacy_partial) for message in messages]
+
+def extract_keywords_batch(messages: List[str], legacy_partial: bool = False, context: Optional[str] = None,
+                           processes: Optional[int] = None, chunk_size: int = 500) -> List[List[str]]:
+    """
+    Extract keywords from many messages, e.g. when replaying archived logs.
+    
+    The lexicon is resolved once, identical messages (ignoring case and
+    surrounding whitespace) are matched once, and the per-message LRU cache
+    is bypassed so a replay does not evict live entries.
+    
+    Args:
+        messages: User messages
+        legacy_partial: Use the original per-word partial matching
+        context: Extra lexicon section to match (e.g. "programmer")
+        processes: Fan out over this many worker processes for large batches
+            (at least POOL_MIN_BATCH distinct messages); None or 1 stays in-process
+        chunk_size: Messages per worker task
+    
+    Returns:
+        Keywords for each message, in input order
+    """
+    sections = _keyword_sections(context)
+    distinct: Dict[str, int] = {}
+    slots = [distinct.setdefault(message.strip().lower(), len(distinct)) for message in messages]
+    texts = list(distinct)
+    
+    if processes and processes > 1 and len(texts) >= POOL_MIN_BATCH:
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), max(chunk_size, 1))]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = [keywords
+                       for chunk in pool.map(_extract_keywords_chunk, chunks,
+                                             repeat(sections), repeat(legacy_partial))
+                       for keywords in chunk]
+    else:
+        results = _extract_keywords_chunk(texts, sections, legacy_partial)
+    
+    # Duplicates share a result, so give every message its own list
+    return [list(results[slot]) for slot in slots]
+
+def get_mode_keywords(mode: Optional[str]) -> List[str]:
+    """Get the verse tags the lexicon always adds for a conversation mode."""
+    return get_lexicon().mode_tags(mode)
@@ -0,0 +1,61 @@
+"""Compact verse record type."""
+import sys
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterator, Tuple
+
+class Verse(Mapping):
+    """
+    A single verse with slotted fields instead of a per-verse dict.
+
+    Tags are interned (a corpus only has a few hundred distinct tags) and the
+    lowercased text and tags are computed once, so topic/keyword matching does
+    no per-call ``.lower()`` work. Verses stay read-only mappings, so existing
+    callers can keep using ``verse['ref']`` and ``verse.get('tags', [])``.
+    """
+
+    __slots__ = ('ref', 'text', 'tags', 'text_lower', 'tag_keys')
+    _KEYS = ('ref', 'text', 'tags')
+
+    def __init__(self, ref: str, text: str, tags: Tuple[str, ...] = ()):
+        self.ref = ref
+        self.text = text
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+        self.text_lower = text.lower()
+        self.tag_keys = tuple(sys.intern(tag.lower()) for tag in self.tags)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'Verse':
+        """Create a verse from a JSON verse object."""
+        if isinstance(data, Verse):
+            return data
+        return cls(data.get('ref', ''), data.get('text', ''), data.get('tags', ()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert back to a plain JSON-serializable dict."""
+        return {'ref': self.ref, 'text': self.text, 'tags': list(self.tags)}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        # Tags are a tuple here but a list in JSON-loaded dicts
+        return self.to_dict() == {key: list(value) if key == 'tags' else value for key, value in other.items()}
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Verse(ref={self.ref!r}, text={self.text!r}, tags={self.tags!r})"
+
+def to_verses(data: List[Mapping]) -> List[Verse]:
+    """Convert JSON verse objects into Verse records."""
+    return [Verse.from_dict(item) for item in data]
@@ -0,0 +1,351 @@
+"""Lookup and ranking indexes over a verse corpus."""
+import math
+from collections import Counter
+from collections.abc import Mapping
+from typing import List, Dict, Optional, Tuple, Iterable, Sequence
+import numpy as np
+from stemmer import tokenize, analyze
+
+def _csr_from_pairs(row_ids: np.ndarray, col_ids: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Group column ids by row; returns (indptr, columns, order) with columns kept in input order per row."""
+    order = np.argsort(row_ids, kind='stable')
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(row_ids, minlength=num_rows)))).astype(np.int64)
+    return indptr, col_ids[order], order
+
+class VerseIndex:
+    """
+    Immutable lookup structures over a verse corpus.
+
+    Everything term-related is stored as flat arrays in CSR layout (a vocabulary
+    dict maps each term to a row, and ``indptr[row]:indptr[row + 1]`` slices
+    the row's sorted verse ids and weights). This keeps queries vectorized and
+    lets the binary corpus store map the arrays straight from disk. Terms are
+    stemmer.analyze tokens, and queries go through the same analyzer, so
+    "Tired." in a message finds "tired" in a verse with a plain hash lookup.
+
+    - tag_index: lowercased tag -> verse ids
+    - search_*: token presence over tags, text and reference (keyword/AND/OR search)
+    - vocabulary/term_*: term statistics over text and tags, with precomputed
+      BM25 weights and an L2-normalized TF-IDF matrix
+    """
+
+    # BM25 parameters used for ranked retrieval
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+
+    ARRAY_FIELDS = ('search_indptr', 'search_ids', 'term_indptr', 'term_verse_ids',
+                    'bm25_weights', 'tfidf_weights', 'tfidf_idf')
+
+    def __init__(self, num_verses: int, tag_index: Dict[str, List[int]],
+                 search_vocab: Dict[str, int], vocabulary: Dict[str, int], **arrays: np.ndarray):
+        self.num_verses = num_verses
+        self.tag_index = tag_index
+        self.search_vocab = search_vocab
+        self.vocabulary = vocabulary
+        self.search_indptr = arrays['search_indptr']
+        self.search_ids = arrays['search_ids']
+        self.term_indptr = arrays['term_indptr']
+        self.term_verse_ids = arrays['term_verse_ids']
+        self.bm25_weights = arrays['bm25_weights']
+        self.tfidf_weights = arrays['tfidf_weights']
+        self.tfidf_idf = arrays['tfidf_idf']
+
+    @classmethod
+    def empty(cls) -> 'VerseIndex':
+        """Index over an empty corpus."""
+        return cls.build([])
+
+    @classmethod
+    def build(cls, verses: Iterable[Mapping]) -> 'VerseIndex':
+        """Build all indexes from verses (dicts or Verse records)."""
+        builder = VerseIndexBuilder()
+        for verse in verses:
+            builder.add(verse)
+        return builder.finish()
+
+    @classmethod
+    def _term_weights(cls, num_docs: int, num_terms: int, term_arr: np.ndarray,
+                      verse_arr: np.ndarray, tf_arr: np.ndarray) -> Dict[str, np.ndarray]:
+        """Precompute BM25 weights and the TF-IDF matrix from flat (term, verse, tf) triples."""
+        doc_freqs = np.bincount(term_arr, minlength=num_terms)
+
+        # BM25 weights
+        lengths = np.bincount(verse_arr, weights=tf_arr, minlength=num_docs).astype(np.float32)
+        avg_length = float(lengths.mean()) if num_docs else 1.0
+        k1, b = cls.BM25_K1, cls.BM25_B
+        norms = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+        bm25_idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        bm25_weights = bm25_idf[term_arr] * tf_arr * (k1 + 1) / (tf_arr + norms[verse_arr])
+
+        # TF-IDF weights (sublinear tf, smoothed idf), L2-normalized per verse
+        tfidf_idf = (np.log((1 + num_docs) / (1 + doc_freqs)) + 1).astype(np.float32)
+        tfidf_weights = (1 + np.log(tf_arr)) * tfidf_idf[term_arr]
+        verse_norms = np.sqrt(np.bincount(verse_arr, weights=tfidf_weights ** 2, minlength=num_docs))
+        tfidf_weights = tfidf_weights / verse_norms[verse_arr]
+
+        term_indptr, term_verse_ids, order = _csr_from_pairs(term_arr, verse_arr, num_terms)
+        return {
+            'term_indptr': term_indptr,
+            'term_verse_ids': term_verse_ids,
+            'bm25_weights': bm25_weights[order].astype(np.float32),
+            'tfidf_weights': tfidf_weights[order].astype(np.float32),
+            'tfidf_idf': tfidf_idf,
+        }
+
+    def tag_ids(self, tag: str) -> List[int]:
+        """Get ids of verses carrying a tag (case-insensitive)."""
+        return self.tag_index.get(tag.lower(), [])
+
+    def has_tag(self, tag: str) -> bool:
+        """Check whether any verse carries the tag."""
+        return tag.lower() in self.tag_index
+
+    def _token_postings(self, token: str) -> np.ndarray:
+        """Get the sorted verse ids containing a token."""
+        row = self.search_vocab.get(token)
+        if row is None:
+            return self.search_ids[:0]
+        return self.search_ids[self.search_indptr[row]:self.search_indptr[row + 1]]
+
+    @staticmethod
+    def _intersect(postings: List[np.ndarray]) -> np.ndarray:
+        """Intersect sorted posting lists, starting from the shortest."""
+        postings = sorted(postings, key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def postings(self, term: str) -> np.ndarray:
+        """Get verse ids containing every (stemmed) token of a (possibly multi-word) term."""
+        tokens = analyze(term)
+        if not tokens:
+            return self.search_ids[:0]
+        return self._intersect([self._token_postings(token) for token in tokens])
+
+    def find(self, terms: List[str], match: str = 'any') -> List[int]:
+        """Find sorted verse ids matching any/all of the terms."""
+        return self.find_ids(terms, match=match).tolist()
+
+    def find_ids(self, terms: List[str], match: str = 'any') -> np.ndarray:
+        """Like find, but as a compact int32 array (4 bytes per id instead of a Python int)."""
+        if match not in ('any', 'all'):
+            raise ValueError(f"match must be 'any' or 'all', got {match!r}")
+        postings = [self.postings(term) for term in terms]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        if match == 'all':
+            ids = self._intersect(postings)
+        elif len(postings) == 1:
+            ids = postings[0]
+        else:
+            ids = np.unique(np.concatenate(postings))
+        return ids.astype(np.int32, copy=False)
+
+    def intersect(self, first: Sequence[int], second: Sequence[int]) -> np.ndarray:
+        """Intersect two sorted verse id sequences into an int32 array."""
+        return np.intersect1d(first, second, assume_unique=True).astype(np.int32, copy=False)
+
+    def _term_slice(self, term: int) -> slice:
+        """Slice of a term's postings in the term arrays."""
+        return slice(self.term_indptr[term], self.term_indptr[term + 1])
+
+    def bm25_scores(self, keywords: List[str]) -> np.ndarray:
+        """Get the BM25 score of every verse for the keywords (indexed by verse id)."""
+        scores = np.zeros(self.num_verses, dtype=np.float32)
+        query_terms = Counter(token for keyword in keywords for token in analyze(keyword))
+        for token, query_count in query_terms.items():
+            term = self.vocabulary.get(token)
+            if term is not None:
+                postings = self._term_slice(term)
+                # Verse ids are unique within a posting list, so fancy-index add is safe
+                scores[self.term_verse_ids[postings]] += self.bm25_weights[postings] * query_count
+        return scores
+
+    def rank(self, keywords: List[str], top_k: int = 5,
+             topic: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Rank verse ids by BM25 score, best first, optionally restricted to a tag."""
+        if top_k <= 0:
+            return []
+        scores = self.bm25_scores(keywords)
+        if topic:
+            candidate_ids = np.asarray(self.tag_ids(topic), dtype=np.int64)
+        else:
+            candidate_ids = np.flatnonzero(scores)
+        candidate_scores = scores[candidate_ids]
+        matched = candidate_scores > 0
+        candidate_ids, candidate_scores = candidate_ids[matched], candidate_scores[matched]
+
+        if len(candidate_ids) > top_k:
+            best = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(candidate_ids))
+        best = best[np.argsort(-candidate_scores[best], kind='stable')]
+        return [(int(candidate_ids[i]), float(candidate_scores[i])) for i in best]
+
+    def score_batch(self, queries: List[str], top_k: int = 5, batch_size: int = 16) -> List[List[int]]:
+        """Get the top TF-IDF verse ids for each query, in query order."""
+        query_counts = [
+            Counter(token for token in analyze(query) if token in self.vocabulary)
+            for query in queries
+        ]
+        results: List[List[int]] = []
+        batch_size = max(batch_size, 1)
+        for start in range(0, len(query_counts), batch_size):
+            results.extend(self._score_chunk(query_counts[start:start + batch_size], top_k))
+        return results
+
+    def _score_chunk(self, query_counts: List[Counter], top_k: int) -> List[List[int]]:
+        """Score one chunk of tokenized queries against all verses as a sparse matrix product."""
+        if top_k <= 0:
+            return [[] for _ in query_counts]
+
+        # Non-zeros of the (queries x terms) matrix, L2-normalized per query
+        rows: List[int] = []
+        terms: List[int] = []
+        values: List[float] = []
+        for row, counts in enumerate(query_counts):
+            for token, count in counts.items():
+                term = self.vocabulary[token]
+                rows.append(row)
+                terms.append(term)
+                values.append((1 + math.log(count)) * float(self.tfidf_idf[term]))
+        if not rows:
+            return [[] for _ in query_counts]
+        row_arr = np.asarray(rows, dtype=np.int64)
+        term_arr = np.asarray(terms, dtype=np.int64)
+        value_arr = np.asarray(values, dtype=np.float32)
+        row_norms = np.sqrt(np.bincount(row_arr, weights=value_arr ** 2, minlength=len(query_counts)))
+        value_arr = value_arr / row_norms[row_arr]
+
+        # Multiply by the (terms x verses) matrix: expand every query non-zero into
+        # its term's posting list and accumulate into a (queries x touched verses) block
+        starts = self.term_indptr[term_arr]
+        lengths = self.term_indptr[term_arr + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        touched, columns = np.unique(self.term_verse_ids[positions], return_inverse=True)
+        cells = np.repeat(row_arr, lengths) * len(touched) + columns
+        products = np.repeat(value_arr, lengths) * self.tfidf_weights[positions]
+        scores = np.bincount(cells, weights=products, minlength=len(query_counts) * len(touched))
+        scores = scores.reshape(len(query_counts), len(touched))
+
+        k = min(top_k, len(touched))
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = touched[np.take_along_axis(best, order, axis=1)]
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return [
+            [int(verse_id) for verse_id, score in zip(row_ids, row_scores) if score > 0]
+            for row_ids, row_scores in zip(best, best_scores)
+        ]
+
+class VerseIndexBuilder:
+    """
+    Builds a VerseIndex incrementally, one verse at a time.
+
+    Each verse's analyzed tokens are buffered as plain lists and turned into
+    postings a chunk of CHUNK_VERSES verses at a time: token ids come from one
+    C-level map over the chunk, and term frequencies and per-verse unique
+    tokens from one np.unique over packed (verse, token) keys. Postings are
+    kept as compact int32/float32 arrays rather than lists of Python ints, so
+    a streaming loader can index a large corpus without ever holding the raw
+    JSON object graph.
+    """
+
+    CHUNK_VERSES = 4096
+
+    def __init__(self):
+        self.num_verses = 0
+        self.tag_index: Dict[str, List[int]] = {}
+        self.search_vocab: Dict[str, int] = {}
+        self.vocabulary: Dict[str, int] = {}
+        # Tokens of the verses added since the last flush
+        self._chunk_start = 0
+        self._doc_tokens: List[str] = []
+        self._doc_lengths: List[int] = []
+        self._ref_tokens: List[str] = []
+        self._ref_lengths: List[int] = []
+        # Flushed postings, one array per chunk
+        self._search_rows: List[np.ndarray] = []
+        self._search_cols: List[np.ndarray] = []
+        self._term_ids: List[np.ndarray] = []
+        self._term_cols: List[np.ndarray] = []
+        self._tfs: List[np.ndarray] = []
+
+    def add(self, verse: Mapping):
+        """Index the next verse (tags are lowercased once here)."""
+        verse_id = self.num_verses
+        self.num_verses += 1
+        tags = verse.get('tags', [])
+        for tag in {tag.lower() for tag in tags}:
+            self.tag_index.setdefault(tag, []).append(verse_id)
+
+        # BM25/TF-IDF documents cover text and tags; search also covers the
+        # reference (the fields VerseManager._matches_keywords searches)
+        doc_tokens = analyze(f"{verse.get('text', '')} {' '.join(tags)}")
+        ref_tokens = analyze(verse.get('ref', ''))
+        self._doc_tokens.extend(doc_tokens)
+        self._doc_lengths.append(len(doc_tokens))
+        self._ref_tokens.extend(ref_tokens)
+        self._ref_lengths.append(len(ref_tokens))
+        if self.num_verses - self._chunk_start >= self.CHUNK_VERSES:
+            self._flush()
+
+    @staticmethod
+    def _token_ids(vocabulary: Dict[str, int], tokens: List[str]) -> np.ndarray:
+        """Map tokens to ids, assigning new ids in first-seen order."""
+        for token in dict.fromkeys(tokens):
+            if token not in vocabulary:
+                vocabulary[token] = len(vocabulary)
+        return np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+
+    def _verse_ids(self, lengths: List[int]) -> np.ndarray:
+        """Verse id of every buffered token, given each buffered verse's token count."""
+        return np.repeat(np.arange(self._chunk_start, self.num_verses, dtype=np.int64), lengths)
+
+    def _postings(self, vocabulary: Dict[str, int], tokens: List[str],
+                  verse_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get (token ids, verse ids, counts) of the distinct (verse, token) pairs, in verse order."""
+        keys, counts = np.unique((verse_ids << 32) | self._token_ids(vocabulary, tokens), return_counts=True)
+        return (keys & 0xFFFFFFFF).astype(np.int32), (keys >> 32).astype(np.int32), counts
+
+    def _flush(self):
+        """Turn the buffered verses' tokens into postings."""
+        if self._chunk_start == self.num_verses:
+            return
+        doc_verse_ids = self._verse_ids(self._doc_lengths)
+        term_ids, term_cols, tfs = self._postings(self.vocabulary, self._doc_tokens, doc_verse_ids)
+        self._term_ids.append(term_ids)
+        self._term_cols.append(term_cols)
+        self._tfs.append(tfs.astype(np.float32))
+
+        search_rows, search_cols, _ = self._postings(
+            self.search_vocab, self._doc_tokens + self._ref_tokens,
+            np.concatenate((doc_verse_ids, self._verse_ids(self._ref_lengths))))
+        self._search_rows.append(search_rows)
+        self._search_cols.append(search_cols)
+
+        self._chunk_start = self.num_verses
+        self._doc_tokens, self._doc_lengths = [], []
+        self._ref_tokens, self._ref_lengths = [], []
+
+    @staticmethod
+    def _concat(chunks: List[np.ndarray], dtype: type) -> np.ndarray:
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+
+    def finish(self) -> VerseIndex:
+        """Compute weights and return the finished index."""
+        self._flush()
+        # Pairs were generated in verse order, so a stable sort by row keeps each row sorted
+        search_indptr, search_ids, _ = _csr_from_pairs(
+            self._concat(self._search_rows, np.int32), self._concat(self._search_cols, np.int32),
+            len(self.search_vocab))
+        arrays = VerseIndex._term_weights(
+            self.num_verses, len(self.vocabulary),
+            self._concat(self._term_ids, np.int32), self._concat(self._term_cols, np.int32),
+            self._concat(self._tfs, np.float32))
+        return VerseIndex(self.num_verses, self.tag_index, self.search_vocab, self.vocabulary,
+                          search_indptr=search_indptr, search_ids=search_ids, **arrays)
@@ -0,0 +1,235 @@
+"""
+Streaming verse file loader.
+
+Reads a JSON array or JSON Lines verse file in fixed-size chunks and hands
+each verse to the index builder as soon as it is parsed, so peak memory is
+the compact Verse records plus the index, never the raw file or the full
+JSON object graph. Extra fields (e.g. commentary) are dropped as each verse
+is converted.
+"""
+import json
+import time
+import codecs
+import logging
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Callable
+from verse import Verse
+from verse_index import VerseIndex, VerseIndexBuilder
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+_WHITESPACE = ' \t\n\r'
+
+class LoadStats:
+    """Progress and throughput of a verse file load."""
+
+    def __init__(self, path: Path, total_bytes: int):
+        self.path = path
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.verses = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def fraction(self) -> float:
+        return self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+
+    def __str__(self) -> str:
+        elapsed = self.elapsed or 1e-9
+        megabytes = self.bytes_read / 1e6
+        return (f"{self.verses} verses, {megabytes:.1f} MB ({self.fraction:.0%}) in {elapsed:.2f}s "
+                f"({megabytes / elapsed:.1f} MB/s, {self.verses / elapsed:.0f} verses/s)")
+
+ProgressCallback = Callable[[LoadStats], None]
+
+def _log_progress(stats: LoadStats):
+    """Default progress callback."""
+    logger.info(f"Loading {stats.path.name}: {stats}")
+
+def _read_chunks(f, stats: LoadStats, chunk_size: int) -> Iterator[str]:
+    """Read a binary file as decoded text chunks, counting bytes read."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        data = f.read(chunk_size)
+        stats.bytes_read += len(data)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+def _iter_json_array(f, stats: LoadStats, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """Parse the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    chunks = _read_chunks(f, stats, chunk_size)
+    buffer = ''
+    position = 0
+    started = False
+    exhausted = False
+    # Elements must be separated by exactly one comma, with no trailing comma
+    expect_separator = False
+    after_comma = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            return False
+        # Drop consumed text so the buffer holds at most about one chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+        if position == len(buffer):
+            if fill():
+                continue
+            raise json.JSONDecodeError("Unexpected end of verses array", buffer, position)
+
+        char = buffer[position]
+        if not started:
+            if char != '[':
+                raise json.JSONDecodeError("Expected a JSON array of verses", buffer, position)
+            started = True
+            position += 1
+        elif char == ']' and not after_comma:
+            # Like json.load, only whitespace may follow the array
+            position += 1
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer):
+                    raise json.JSONDecodeError("Extra data", buffer, position)
+                if not fill():
+                    return
+        elif expect_separator:
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            expect_separator = False
+            after_comma = True
+            position += 1
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most likely the element straddles a chunk boundary; read on and retry
+                if not exhausted and fill():
+                    continue
+                raise
+            if end == len(buffer) and not exhausted:
+                # A number or literal may continue in the next chunk
+                if fill():
+                    continue
+            position = end
+            expect_separator = True
+            after_comma = False
+            yield item
+
+def _iter_json_lines(f, stats: LoadStats, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """Parse one verse per non-blank line."""
+    for line_number, line in enumerate(f, 1):
+        stats.bytes_read += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"{e.msg} (line {line_number})", e.doc, e.pos) from None
+
+def _is_json_lines(path: Path) -> bool:
+    """Detect JSON Lines by suffix, otherwise by a first non-blank line that is a JSON object on its own."""
+    if path.suffix.lower() in JSON_LINES_SUFFIXES:
+        return True
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.decode('utf-8-sig', errors='ignore').strip()
+            if not line:
+                continue
+            if not line.startswith('{'):
+                return False
+            try:
+                return isinstance(json.loads(line), dict)
+            except json.JSONDecodeError:
+                return False
+    return False
+
+def _to_verse(record: Any, number: int) -> Verse:
+    """Convert a parsed record to a Verse, rejecting anything that is not a verse object."""
+    if not isinstance(record, dict):
+        raise ValueError(f"Verse {number} is a {type(record).__name__}, not an object")
+    if not record.get('ref') and not record.get('text'):
+        raise ValueError(f"Verse {number} has no ref or text")
+    for field in ('ref', 'text'):
+        if not isinstance(record.get(field, ''), str):
+            raise ValueError(f"Verse {number} {field} must be a string")
+    tags = record.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError(f"Verse {number} tags must be a list of strings")
+    return Verse.from_dict(record)
+
+def iter_verse_records(path: Path, stats: Optional[LoadStats] = None,
+                       chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream raw verse objects from a JSON array or JSON Lines file.
+
+    Args:
+        path: Verses file
+        stats: Optional LoadStats updated with bytes read
+        chunk_size: Bytes read per chunk (JSON arrays)
+
+    Yields:
+        Verse objects as parsed from the file
+    """
+    path = Path(path)
+    stats = stats or LoadStats(path, path.stat().st_size)
+    parse = _iter_json_lines if _is_json_lines(path) else _iter_json_array
+    with open(path, 'rb') as f:
+        yield from parse(f, stats, chunk_size)
+
+def load_verse_file(path: Path, on_progress: Optional[ProgressCallback] = _log_progress,
+                    progress_interval: float = 2.0,
+                    chunk_size: int = CHUNK_SIZE) -> Tuple[List[Verse], VerseIndex]:
+    """
+    Stream a verse file into Verse records and a VerseIndex.
+
+    Args:
+        path: JSON array or JSON Lines verses file
+        on_progress: Called with LoadStats every progress_interval seconds
+            (logs by default; None disables progress reports)
+        progress_interval: Seconds between progress reports
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Tuple of (verses, index)
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        json.JSONDecodeError: If the file is not valid JSON / JSON Lines
+        ValueError: If a record is not a verse object
+    """
+    path = Path(path)
+    stats = LoadStats(path, path.stat().st_size)
+    verses: List[Verse] = []
+    builder = VerseIndexBuilder()
+    next_report = progress_interval
+    for record in iter_verse_records(path, stats, chunk_size):
+        verse = _to_verse(record, stats.verses + 1)
+        verses.append(verse)
+        builder.add(verse)
+        stats.verses += 1
+        if on_progress is not None and stats.elapsed >= next_report:
+            on_progress(stats)
+            next_report = stats.elapsed + progress_interval
+    index = builder.finish()
+    logger.info(f"Streamed {path.name}: {stats}")
+    return verses, index
@@ -0,0 +1,280 @@
+"""
+Compact binary verse corpus with memory-mapped loading.
+
+Parsing bible_verses.json and rebuilding every index costs time and memory in
+each process (CLI, GUI, Streamlit, launcher subprocesses). The build step below
+compiles the JSON once into a .bvc file holding:
+
+- a UTF-8 string table with every reference and text, plus an offset array
+- per-verse tag ids, the distinct tag names and one bitset per tag
+- the VerseIndex vocabularies and CSR arrays (search postings, BM25 weights,
+  TF-IDF matrix)
+
+Loading maps the file read-only and wraps the sections in numpy views, so
+startup does no parsing beyond small vocabularies and the OS shares the pages
+between every process that opens the same file.
+
+Usage:
+    python verse_store.py bible_verses.json            # writes bible_verses.bvc
+    python verse_store.py bible_verses.json -o out.bvc
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple
+import numpy as np
+from verse import Verse
+from verse_index import VerseIndex
+from verse_loader import load_verse_file
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BVC1'
+# Version 2: index terms are stemmed
+# Version 3: stems drop a final silent e
+FORMAT_VERSION = 3
+COMPILED_SUFFIX = '.bvc'
+_ALIGNMENT = 8
+_SEPARATOR = '\x00'
+
+def compiled_path_for(source: Path) -> Path:
+    """Get the default compiled corpus path next to a JSON corpus."""
+    return Path(source).with_suffix(COMPILED_SUFFIX)
+
+def _join_strings(strings: List[str]) -> np.ndarray:
+    """Encode strings into one separator-joined UTF-8 byte array."""
+    return np.frombuffer(_SEPARATOR.join(strings).encode('utf-8'), dtype=np.uint8)
+
+def _split_strings(blob: np.ndarray) -> List[str]:
+    """Decode a separator-joined UTF-8 byte array."""
+    if not len(blob):
+        return []
+    return blob.tobytes().decode('utf-8').split(_SEPARATOR)
+
+def _encode_verses(verses: List[Verse]) -> Dict[str, np.ndarray]:
+    """Encode verse strings and tags into flat arrays."""
+    encoded: List[bytes] = []
+    for verse in verses:
+        encoded.append(verse.get('ref', '').encode('utf-8'))
+        encoded.append(verse.get('text', '').encode('utf-8'))
+    # string_offsets[2i]:string_offsets[2i + 1] is verse i's ref, the next span its text
+    string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=string_offsets[1:])
+
+    tag_ids: Dict[str, int] = {}
+    verse_tags: List[int] = []
+    verse_tag_offsets = np.zeros(len(verses) + 1, dtype=np.int64)
+    for verse_id, verse in enumerate(verses):
+        verse_tags.extend(tag_ids.setdefault(tag, len(tag_ids)) for tag in verse.get('tags', []))
+        verse_tag_offsets[verse_id + 1] = len(verse_tags)
+
+    # One bit per verse for every tag, packed little-endian within each byte
+    bits = np.zeros((len(tag_ids), len(verses)), dtype=np.uint8)
+    tag_rows = np.asarray(verse_tags, dtype=np.int64)
+    tag_cols = np.repeat(np.arange(len(verses)), np.diff(verse_tag_offsets))
+    bits[tag_rows, tag_cols] = 1
+
+    return {
+        'strings': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'string_offsets': string_offsets,
+        'tag_names': _join_strings(list(tag_ids)),
+        'verse_tag_offsets': verse_tag_offsets,
+        'verse_tag_ids': np.asarray(verse_tags, dtype=np.int32),
+        'tag_bitsets': np.packbits(bits, axis=1, bitorder='little'),
+    }
+
+def compile_corpus(source: Path, target: Optional[Path] = None) -> Path:
+    """
+    Compile a JSON verse corpus into the binary format.
+
+    Args:
+        source: Path to the JSON array or JSON Lines verses file
+        target: Output path (defaults to the source path with a .bvc suffix)
+
+    Returns:
+        Path of the written file
+    """
+    source = Path(source)
+    target = Path(target) if target else compiled_path_for(source)
+    verses, index = load_verse_file(source)
+
+    sections = _encode_verses(verses)
+    sections['search_terms'] = _join_strings(list(index.search_vocab))
+    sections['terms'] = _join_strings(list(index.vocabulary))
+    for field in VerseIndex.ARRAY_FIELDS:
+        sections[field] = np.ascontiguousarray(getattr(index, field))
+
+    stat = source.stat()
+    header: Dict[str, Any] = {
+        'version': FORMAT_VERSION,
+        'num_verses': len(verses),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'sections': {},
+    }
+    # Section offsets depend on the header length, so lay out relative offsets first
+    offset = 0
+    for name, array in sections.items():
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        header['sections'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset += array.nbytes
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // _ALIGNMENT) * _ALIGNMENT
+
+    # Write to a temporary file and rename so readers never see a partial corpus
+    temp_path = target.with_name(target.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in sections.items():
+            f.seek(data_start + header['sections'][name]['offset'])
+            f.write(array.tobytes())
+    os.replace(temp_path, target)
+    logger.info(f"Compiled {len(verses)} verses from {source} into {target}")
+    return target
+
+def read_header(path: Path) -> Tuple[Dict[str, Any], int]:
+    """Read a compiled corpus header; returns (header, data start offset)."""
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 4)
+        if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a compiled verse corpus: {path}")
+        (header_length,) = struct.unpack('<I', prefix[len(MAGIC):])
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled corpus version {header.get('version')} in {path}")
+    data_start = -(-(len(MAGIC) + 4 + header_length) // _ALIGNMENT) * _ALIGNMENT
+    return header, data_start
+
+def is_fresh(compiled: Path, source: Path) -> bool:
+    """Check that a compiled corpus was built from the current source file."""
+    try:
+        header, _ = read_header(compiled)
+        stat = Path(source).stat()
+    except (OSError, ValueError):
+        return False
+    return header['source_size'] == stat.st_size and header['source_mtime_ns'] == stat.st_mtime_ns
+
+def find_compiled(source: Path) -> Optional[Path]:
+    """
+    Find a usable compiled corpus for a verses path.
+
+    A .bvc path is used as-is. For a JSON path, the sibling .bvc file is used
+    when it is up to date with the JSON (or when the JSON is absent).
+    """
+    source = Path(source)
+    if source.suffix == COMPILED_SUFFIX:
+        return source if source.exists() else None
+    candidate = compiled_path_for(source)
+    if not candidate.exists():
+        return None
+    if not source.exists() or is_fresh(candidate, source):
+        return candidate
+    logger.info(f"Ignoring stale compiled corpus {candidate}; rebuild it with verse_store.py")
+    return None
+
+class MappedVerses(Sequence):
+    """Read-only sequence of verses decoded on demand from a mapped corpus."""
+
+    def __init__(self, sections: Dict[str, np.ndarray], tag_names: List[str]):
+        self._strings = sections['strings']
+        self._string_offsets = sections['string_offsets']
+        self._verse_tag_offsets = sections['verse_tag_offsets']
+        self._verse_tag_ids = sections['verse_tag_ids']
+        self._tag_names = tag_names
+        # Decoded verses are kept, so only verses actually used cost Python objects
+        self._decoded: List[Optional[Verse]] = [None] * len(self)
+
+    def __len__(self) -> int:
+        return len(self._verse_tag_offsets) - 1
+
+    def _string(self, position: int) -> str:
+        start, end = self._string_offsets[position], self._string_offsets[position + 1]
+        return self._strings[start:end].tobytes().decode('utf-8')
+
+    def __getitem__(self, verse_id):
+        if isinstance(verse_id, slice):
+            return [self[i] for i in range(*verse_id.indices(len(self)))]
+        if verse_id < 0:
+            verse_id += len(self)
+        if not 0 <= verse_id < len(self):
+            raise IndexError("verse index out of range")
+        verse = self._decoded[verse_id]
+        if verse is None:
+            tag_start, tag_end = self._verse_tag_offsets[verse_id], self._verse_tag_offsets[verse_id + 1]
+            verse = Verse(
+                self._string(2 * verse_id),
+                self._string(2 * verse_id + 1),
+                [self._tag_names[tag_id] for tag_id in self._verse_tag_ids[tag_start:tag_end]],
+            )
+            self._decoded[verse_id] = verse
+        return verse
+
+class CompiledCorpus:
+    """A memory-mapped compiled corpus exposing its verses and prebuilt index."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        header, data_start = read_header(self.path)
+        with open(self.path, 'rb') as f:
+            # The mapping outlives the file handle; numpy views keep it alive
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        sections: Dict[str, np.ndarray] = {}
+        for name, spec in header['sections'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            array = np.frombuffer(self._mmap, dtype=dtype, count=count,
+                                  offset=data_start + spec['offset'])
+            sections[name] = array.reshape(spec['shape'])
+
+        self.num_verses = header['num_verses']
+        self.source_size = header['source_size']
+        self.source_mtime_ns = header['source_mtime_ns']
+        tag_names = _split_strings(sections['tag_names'])
+        self.verses = MappedVerses(sections, tag_names)
+        self.index = VerseIndex(
+            self.num_verses,
+            self._tag_index(sections['tag_bitsets'], tag_names),
+            {term: row for row, term in enumerate(_split_strings(sections['search_terms']))},
+            {term: row for row, term in enumerate(_split_strings(sections['terms']))},
+            **{field: sections[field] for field in VerseIndex.ARRAY_FIELDS},
+        )
+
+    def _tag_index(self, bitsets: np.ndarray, tag_names: List[str]) -> Dict[str, List[int]]:
+        """Expand tag bitsets into the lowercased tag -> verse ids index."""
+        tag_index: Dict[str, List[int]] = {}
+        for row, name in enumerate(tag_names):
+            bits = np.unpackbits(bitsets[row], count=self.num_verses, bitorder='little')
+            ids = np.flatnonzero(bits).tolist()
+            key = name.lower()
+            # Tags differing only in case share one entry
+            tag_index[key] = sorted(set(tag_index[key]).union(ids)) if key in tag_index else ids
+        return tag_index
+
+def load_corpus(path: Path) -> CompiledCorpus:
+    """Map a compiled corpus from disk."""
+    return CompiledCorpus(path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point for the build step."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile a JSON verse corpus into the binary .bvc format.")
+    parser.add_argument('source', nargs='?', default='bible_verses.json', help='JSON verses file')
+    parser.add_argument('-o', '--output', help='Output path (default: <source>.bvc)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    target = compile_corpus(Path(args.source), Path(args.output) if args.output else None)
+    print(f"Wrote {target}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())